@@ -0,0 +1,120 @@
+# SPDX-License-Identifier: MIT
+import warnings
+
+import numpy as np
+
+from ebike.database import connect, ensure_db_exists, filter_clause
+from ebike.store import load_columns
+
+
+class PairedResults:
+    # Results of several solvers on the same scenario as (solver, target)
+    # matrices, so that solvers can be compared target by target. Targets a
+    # solver was not evaluated on (e.g. after early stopping) are masked out of
+    # every comparison that involves that solver.
+    def __init__(self, solvers, reached, ik_time, evaluated):
+        self.solvers = list(solvers)
+        self.index = {solver: i for i, solver in enumerate(self.solvers)}
+        self.reached = reached & evaluated
+        self.ik_time = np.where(self.reached, ik_time, np.nan)
+        self.evaluated = evaluated
+
+    @classmethod
+    def from_results(cls, results, num_targets=None):
+        # results maps solver names to result arrays with a target field
+        if num_targets is None:
+            num_targets = max(
+                (
+                    int(data["target"].max()) + 1
+                    for data in results.values()
+                    if len(data)
+                ),
+                default=0,
+            )
+        shape = (len(results), num_targets)
+        reached = np.zeros(shape, dtype=bool)
+        ik_time = np.full(shape, np.nan)
+        evaluated = np.zeros(shape, dtype=bool)
+        for i, data in enumerate(results.values()):
+            target = np.asarray(data["target"])
+            reached[i, target] = data["reached"]
+            ik_time[i, target] = data["ik_time"]
+            evaluated[i, target] = True
+        return cls(results.keys(), reached, ik_time, evaluated)
+
+    @classmethod
+    def from_db(cls, robot, scenario, solvers, filters=None):
+        # uses the latest complete experiment of every solver
+        ensure_db_exists()
+        where, filter_values = filter_clause(filters)
+        results = {}
+        num_targets = 0
+        with connect() as conn:
+            cur = conn.cursor()
+            for solver in solvers:
+                cur.execute(
+                    "SELECT id, num_targets FROM experiments WHERE robot = ? AND scenario = ? AND solver = ? AND complete = 1"
+                    + where
+                    + " ORDER BY id DESC LIMIT 1",
+                    (robot, scenario, solver, *filter_values),
+                )
+                row = cur.fetchone()
+                if row is None:
+                    print(f"Skipping {solver} on {scenario} because it does not exist")
+                    continue
+                experiment_id, experiment_targets = row
+                target, reached, ik_time = load_columns(
+                    experiment_id, ("target", "reached", "ik_time")
+                )
+                results[solver] = {
+                    "target": target,
+                    "reached": reached,
+                    "ik_time": ik_time,
+                }
+                num_targets = max(num_targets, experiment_targets or 0)
+        return cls.from_results(results, num_targets or None)
+
+    def _pair(self, a, b):
+        return self.index[a], self.index[b]
+
+    def common(self):
+        # targets every solver was evaluated on
+        return self.evaluated.all(axis=0)
+
+    def solved_union(self):
+        return self.reached.any(axis=0) & self.common()
+
+    def solved_intersection(self):
+        return self.reached.all(axis=0)
+
+    def solved_exclusively(self):
+        # (solver, target) mask of targets only that solver reached
+        return self.reached & (self.reached.sum(axis=0) == 1) & self.common()
+
+    def win_matrix(self):
+        # wins[i, j] is the number of targets solver i reached and solver j did
+        # not, among the targets both were evaluated on
+        both = self.evaluated[:, None, :] & self.evaluated[None, :, :]
+        return np.sum(
+            self.reached[:, None, :] & ~self.reached[None, :, :] & both, axis=-1
+        )
+
+    def wins(self, a, b):
+        # targets solver a reached and solver b did not
+        i, j = self._pair(a, b)
+        return np.flatnonzero(self.reached[i] & ~self.reached[j] & self.evaluated[j])
+
+    def speedup(self, a, b):
+        # per-target ratio of the solve time of solver b to that of solver a on
+        # the targets both reached, values above 1 mean that a is faster
+        i, j = self._pair(a, b)
+        targets = np.flatnonzero(self.reached[i] & self.reached[j])
+        return targets, self.ik_time[j, targets] / self.ik_time[i, targets]
+
+    def speedup_matrix(self, statistic=np.nanmedian):
+        # statistic of the per-target speedup of solver i over solver j
+        ratios = self.ik_time[None, :, :] / self.ik_time[:, None, :]
+        with warnings.catch_warnings():
+            # pairs without commonly solved targets give NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return statistic(ratios, axis=-1)
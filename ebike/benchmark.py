@@ -1,26 +1,249 @@
 # SPDX-License-Identifier: MIT
 
+import hashlib
+import json
+import multiprocessing
 import os
+import queue
+import shutil
 import sys
 import tempfile
-from collections import defaultdict
+import threading
+import time
+from collections import defaultdict, deque
 from datetime import datetime
 
+import numpy as np
 import reach
 import reach_ros
 
-from ebike.utils import save_result
+from ebike import database, store, utils
+from ebike.environment import get_host_info, get_solver_version
+from ebike.ik import IK_TIMEOUT
+from ebike.scenario import write_pcd
+from ebike.scheduling import estimate_costs, longest_first, print_schedule
+from ebike.stats import ResultSummary, median_interval, wilson_interval
+from ebike.summary import ExperimentSummary, insert_summary
 from ebike.visualization import plot_results, print_results
 
+# targets per study in streaming mode if no checkpoint interval is given
+STREAMING_BATCH_SIZE = 1000
+
+_cpu_queue = None
+
+
+def _init_worker(cpu_queue):
+    global _cpu_queue
+    _cpu_queue = cpu_queue
+
+
+def _set_reach_plugins():
+    if "REACH_PLUGINS" not in os.environ:
+        os.environ["REACH_PLUGINS"] = "reach_ros_plugins"
+    elif "reach_ros_plugins" not in os.environ["REACH_PLUGINS"].split(":"):
+        os.environ["REACH_PLUGINS"] = os.environ["REACH_PLUGINS"] + ":reach_ros_plugins"
+
+
+def get_isolated_cpus():
+    # cores reserved with the isolcpus kernel parameter, e.g. "2-5,8"
+    cpus = []
+    with open("/sys/devices/system/cpu/isolated", "r") as f:
+        for part in f.read().strip().split(","):
+            if "-" in part:
+                first, last = part.split("-")
+                cpus.extend(range(int(first), int(last) + 1))
+            elif part:
+                cpus.append(int(part))
+    if not cpus:
+        raise RuntimeError(
+            "No isolated CPU cores, reserve some with the isolcpus kernel parameter"
+        )
+    return cpus
+
+
+def _get_cpu_frequency():
+    frequencies = []
+    for cpu in os.sched_getaffinity(0):
+        try:
+            with open(
+                f"/sys/devices/system/cpu/cpu{cpu}/cpufreq/scaling_cur_freq", "r"
+            ) as f:
+                frequencies.append(int(f.read()) / 1000)
+        except (OSError, ValueError):
+            pass
+    return float(np.mean(frequencies)) if frequencies else None
+
+
+def _sample_cpu_frequency(samples, done, interval=1.0):
+    # cores clock down when they get hot and up when others are idle, so the
+    # frequency is sampled from the start to the end of a study
+    samples.append(_get_cpu_frequency())
+    while not done.wait(interval):
+        samples.append(_get_cpu_frequency())
+    samples.append(_get_cpu_frequency())
+
+
+def _run_study(config, config_name, results_dir, interactive, targets, keep_xml):
+    samples = []
+    done = threading.Event()
+    sampler = threading.Thread(
+        target=_sample_cpu_frequency, args=(samples, done), daemon=True
+    )
+    sampler.start()
+    wall_time = time.perf_counter()
+    cpu_time = time.process_time()
+    try:
+        reach.runReachStudy(config, config_name, results_dir, interactive)
+    finally:
+        done.set()
+        sampler.join()
+    frequencies = [frequency for frequency in samples if frequency is not None]
+    measurements = {
+        "wall_time": time.perf_counter() - wall_time,
+        "cpu_time": time.process_time() - cpu_time,
+        "cpu_frequency": float(np.mean(frequencies)) if frequencies else None,
+        "cpu_frequency_min": float(np.min(frequencies)) if frequencies else None,
+        "load_average": os.getloadavg()[0],
+    }
+    # REACH only hands out its results through reach.db.xml, so the database is
+    # reduced to a compact array right away and the study folder is dropped
+    study_dir = os.path.join(results_dir, config_name)
+    db = reach.load(os.path.join(study_dir, "reach.db.xml"))
+    records = list(db.results[0])
+    # warm-up targets are evaluated first and not part of the results
+    records = records[len(records) - len(targets) :]
+    results = utils.records_to_array(records, targets)
+    goal_states = utils.records_to_goal_states(records)
+    if not keep_xml:
+        shutil.rmtree(study_dir, ignore_errors=True)
+    return results, goal_states, measurements
+
+
+def _run_job(robot, scenario, ik, results_dir, index, targets, pcd_file, keep_xml):
+    # Every job gets a fresh process (maxtasksperchild=1) with its own ROS node
+    # in a separate namespace, so parameters set by one solver never reach another.
+    cpu = None if _cpu_queue is None else _cpu_queue.get()
+    try:
+        if cpu is not None:
+            os.sched_setaffinity(0, {cpu})
+        reach_ros.init_ros(sys.argv + ["--ros-args", "-r", f"__ns:=/ebike_{index}"])
+        _set_reach_plugins()
+        robot.set_config()
+        config = scenario.get_config(robot.get_planning_group())
+        if pcd_file is not None:
+            config["target_pose_generator"]["pcd_file"] = pcd_file
+        ik.set_config(robot.get_planning_group())
+        config_name = f"{robot.name} {scenario.name} {ik.name} {index}"
+        return _run_study(config, config_name, results_dir, False, targets, keep_xml)
+    finally:
+        if cpu is not None:
+            _cpu_queue.put(cpu)
+
+
+def get_config_hash(robot_hash, scenario_hash, parameters):
+    h = hashlib.sha256()
+    h.update(robot_hash.encode())
+    h.update(scenario_hash.encode())
+    h.update(json.dumps(parameters, sort_keys=True).encode())
+    h.update(repr(IK_TIMEOUT).encode())
+    return h.hexdigest()
+
+
+class EarlyStopping:
+    def __init__(
+        self,
+        rate_tolerance=0.1,
+        time_tolerance=0.001,
+        confidence=0.95,
+        min_targets=100,
+        batch_size=50,
+        seed=None,
+    ):
+        self.rate_tolerance = rate_tolerance
+        self.time_tolerance = time_tolerance
+        self.confidence = confidence
+        self.min_targets = min_targets
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+
+    def converged(self, results):
+        if len(results) < self.min_targets:
+            return False
+        reached = results["reached"]
+        low, high = wilson_interval(np.sum(reached), len(reached), self.confidence)
+        if high - low > self.rate_tolerance:
+            return False
+        times = results["ik_time"][reached]
+        if len(times) == 0:
+            return True
+        low, high = median_interval(times, self.confidence)
+        return high - low <= self.time_tolerance
+
+
+class _Run:
+    def __init__(
+        self, robot, scenario, ik, config_hash, num_targets, experiment_id, streaming
+    ):
+        self.robot = robot
+        self.scenario = scenario
+        self.ik = ik
+        self.name = f"{robot.name} {scenario.name} {ik.name}"
+        self.config_hash = config_hash
+        self.experiment_id = experiment_id
+        self.num_targets = num_targets
+        # in streaming mode only the summary is kept, the per-target results
+        # live in the database
+        self.results = None
+        if not streaming:
+            self.results = np.zeros(num_targets, dtype=utils.RESULT_DTYPE)
+        self.summary = ResultSummary(experiment_id)
+        self.evaluated = np.zeros(num_targets, dtype=bool)
+        self.metadata = None
+        self.subsets = []
+        self.measurements = []
+        self.target_cost = None
+        self.costs = []
+        self.queued = 0
+        self.running = 0
+        self.stopped = False
+
 
 class Benchmark:
-    def __init__(self, interactive=False):
+    def __init__(
+        self,
+        interactive=False,
+        workers=1,
+        cpus=None,
+        shards=1,
+        resume=False,
+        repetitions=1,
+        checkpoint_interval=None,
+        keep_xml=False,
+        early_stopping=None,
+        warmup_targets=0,
+        streaming=False,
+    ):
         reach_ros.init_ros(sys.argv)
         self.iks = []
         self.robots = []
         self.scenarios = []
         self.results = defaultdict(lambda: defaultdict(dict))
         self.interactive = interactive
+        self.workers = workers
+        self.cpus = None if cpus is None else list(cpus)
+        if self.cpus == []:
+            raise ValueError("At least one CPU core is needed to pin the workers to")
+        self.shards = shards
+        self.resume = resume
+        self.repetitions = repetitions
+        self.checkpoint_interval = checkpoint_interval
+        self.keep_xml = keep_xml
+        self.early_stopping = early_stopping
+        self.warmup_targets = warmup_targets
+        self.streaming = streaming
+        if streaming and checkpoint_interval is None:
+            self.checkpoint_interval = STREAMING_BATCH_SIZE
+        self.writer = None
         self.start_time = datetime.now()
 
     def add_ik(self, ik):
@@ -32,37 +255,357 @@ class Benchmark:
     def add_robot(self, robot):
         self.robots.append(robot)
 
+    def get_cells(self):
+        return [
+            (robot, scenario, ik)
+            for robot in self.robots
+            for scenario in self.scenarios
+            for ik in self.iks
+        ]
+
     def run(self):
-        results_dir = tempfile.mkdtemp()
-        if "REACH_PLUGINS" in os.environ:
-            os.environ["REACH_PLUGINS"] = (
-                os.environ["REACH_PLUGINS"] + ":reach_ros_plugins"
-            )
+        _set_reach_plugins()
+        if self.keep_xml:
+            results_dir = tempfile.mkdtemp()
+            self._run(results_dir)
+            print(f"Results saved in {results_dir}")
         else:
-            os.environ["REACH_PLUGINS"] = "reach_ros_plugins"
-        for robot in self.robots:
-            robot.set_config()
-            for scenario in self.scenarios:
-                config = scenario.get_config(robot.get_planning_group())
-                for ik in self.iks:
+            with tempfile.TemporaryDirectory() as results_dir:
+                self._run(results_dir)
+        return self.results
+
+    def _run(self, results_dir):
+        runs = self._plan_runs(results_dir)
+        estimate_costs(runs)
+        # the order only matters when several workers share the runs
+        if self.workers > 1:
+            runs = longest_first(runs)
+        print_schedule(runs, self.workers)
+        self.writer = database.Writer()
+        try:
+            if self.workers > 1 or self.shards > 1:
+                self._run_parallel(runs, results_dir)
+            else:
+                self._run_sequential(runs, results_dir)
+        finally:
+            self.writer.close()
+            self.writer = None
+
+    def _plan_runs(self, results_dir):
+        robot_hashes = {}
+        solver_versions = {}
+        host_info = get_host_info()
+        runs = []
+        for robot, scenario, ik in self.get_cells():
+            if id(robot) not in robot_hashes:
+                h = hashlib.sha256()
+                for description in robot.get_description():
+                    h.update(description.encode())
+                robot_hashes[id(robot)] = h.hexdigest()
+            planning_group = robot.get_planning_group()
+            parameters = ik.get_parameters(planning_group)
+            scenario_hash = scenario.get_file_hash()
+            config_hash = get_config_hash(
+                robot_hashes[id(robot)], scenario_hash, parameters
+            )
+            plugin_name = parameters.get(
+                f"robot_description_kinematics.{planning_group}.kinematics_solver"
+            )
+            if plugin_name not in solver_versions:
+                solver_versions[plugin_name] = get_solver_version(plugin_name)
+            metadata = dict(
+                host_info,
+                solver_version=solver_versions[plugin_name],
+                scenario_hash=scenario_hash,
+                ik_timeout=IK_TIMEOUT,
+                parameters=json.dumps(parameters, sort_keys=True),
+            )
+            experiments = database.find_experiments(config_hash) if self.resume else []
+            completed = sum(complete for _, complete in experiments)
+            partial = [
+                experiment_id for experiment_id, complete in experiments if not complete
+            ]
+            if completed >= self.repetitions:
+                print(
+                    f"Skipping {ik.name} on robot {robot.name}, scenario {scenario.name}: {completed} runs already completed"
+                )
+                continue
+            fields, points = scenario.get_targets()
+            for _ in range(completed, self.repetitions):
+                experiment_id = partial.pop(0) if partial else None
+                run = _Run(
+                    robot,
+                    scenario,
+                    ik,
+                    config_hash,
+                    len(points),
+                    experiment_id,
+                    self.streaming,
+                )
+                run.metadata = metadata
+                if experiment_id is not None:
+                    previous = database.load_results(experiment_id)
+                    self._update_run(run, previous)
                     print(
-                        f"Running benchmark for {ik.name} on robot {robot.name}, scenario {scenario.name}"
+                        f"Resuming {ik.name} on robot {robot.name}, scenario {scenario.name} after {len(previous)} targets"
                     )
-                    ik.set_config(robot.get_planning_group())
-                    config_name = f"{robot.name} {scenario.name} {ik.name}"
-                    reach.runReachStudy(
-                        config, config_name, results_dir, self.interactive
+                    if self.early_stopping is not None:
+                        run.stopped = self.early_stopping.converged(previous)
+                if not run.stopped:
+                    run.subsets = self._split_targets(
+                        fields,
+                        points,
+                        np.flatnonzero(~run.evaluated),
+                        results_dir,
+                        len(runs),
                     )
-                    db = reach.load(f"{results_dir}/{config_name}/reach.db.xml")
-                    self.results[robot.name][scenario.name][ik.name] = db.results
-                    save_result(
-                        robot.name, scenario.name, ik.name, self.start_time, db.results
+                runs.append(run)
+        return runs
+
+    def _split_targets(self, fields, points, remaining, results_dir, tag):
+        # Targets are evaluated in blocks of checkpoint_interval targets per shard,
+        # every block is saved as soon as it is finished. Within a block, shards
+        # take every n-th target so that easy and hard regions of the cloud are
+        # spread evenly over the workers. With early stopping, blocks are drawn
+        # in random order so that every prefix is an unbiased sample.
+        if len(remaining) == 0:
+            return []
+        if self.early_stopping is not None:
+            remaining = self.early_stopping.rng.permutation(remaining)
+            block_size = self.early_stopping.batch_size * self.shards
+        elif self.checkpoint_interval is not None:
+            block_size = self.checkpoint_interval * self.shards
+        elif (
+            len(remaining) == len(points)
+            and self.shards == 1
+            and self.warmup_targets == 0
+        ):
+            return [(remaining, None)]
+        else:
+            block_size = len(remaining)
+        subsets = []
+        for start in range(0, len(remaining), block_size):
+            block = remaining[start : start + block_size]
+            n = min(self.shards, len(block))
+            for k in range(n):
+                indices = block[k::n]
+                pcd_file = os.path.join(
+                    results_dir, f"targets_{tag}_{len(subsets)}.pcd"
+                )
+                warmup = indices[: self.warmup_targets]
+                write_pcd(
+                    pcd_file,
+                    fields,
+                    points[np.concatenate([warmup, indices])],
+                    "binary",
+                )
+                subsets.append((indices, pcd_file))
+        return subsets
+
+    def _run_sequential(self, runs, results_dir):
+        affinity = os.sched_getaffinity(0)
+        if self.cpus:
+            os.sched_setaffinity(0, {self.cpus[0]})
+        try:
+            self._run_studies(runs, results_dir)
+        finally:
+            os.sched_setaffinity(0, affinity)
+
+    def _run_studies(self, runs, results_dir):
+        robot = None
+        for i, run in enumerate(runs):
+            if run.robot is not robot:
+                robot = run.robot
+                robot.set_config()
+            print(
+                f"Running benchmark for {run.ik.name} on robot {robot.name}, scenario {run.scenario.name}"
+            )
+            config = run.scenario.get_config(robot.get_planning_group())
+            run.ik.set_config(robot.get_planning_group())
+            for k, (indices, pcd_file) in enumerate(run.subsets):
+                if run.stopped:
+                    break
+                if pcd_file is not None:
+                    config["target_pose_generator"]["pcd_file"] = pcd_file
+                results, goal_states, measurements = _run_study(
+                    config,
+                    f"{run.name} {i} {k}",
+                    results_dir,
+                    self.interactive,
+                    indices,
+                    self.keep_xml,
+                )
+                self._save_subset(run, results, goal_states, measurements)
+            self._finish_run(run)
+
+    def _run_parallel(self, runs, results_dir):
+        ctx = multiprocessing.get_context("spawn")
+        cpu_queue = None
+        if self.cpus:
+            cpu_queue = ctx.Queue()
+            for cpu in self.cpus:
+                cpu_queue.put(cpu)
+        # Jobs are handed to the pool only when a worker is free, so the
+        # remaining blocks of a cell can be dropped once it has converged.
+        pending = deque((run, subset) for run in runs for subset in run.subsets)
+        finished = queue.Queue()
+        for run in runs:
+            run.queued = len(run.subsets)
+            if not run.subsets:
+                self._finish_run(run)
+        with ctx.Pool(
+            self.workers,
+            initializer=_init_worker,
+            initargs=(cpu_queue,),
+            maxtasksperchild=1,
+        ) as pool:
+            index = 0
+            running = 0
+            while pending or running:
+                while pending and running < self.workers:
+                    run, (indices, pcd_file) = pending.popleft()
+                    run.queued -= 1
+                    if run.stopped:
+                        continue
+                    if run.running == 0 and run.queued == len(run.subsets) - 1:
+                        print(
+                            f"Running benchmark for {run.ik.name} on robot {run.robot.name}, scenario {run.scenario.name}"
+                        )
+                    pool.apply_async(
+                        _run_job,
+                        (
+                            run.robot,
+                            run.scenario,
+                            run.ik,
+                            results_dir,
+                            index,
+                            indices,
+                            pcd_file,
+                            self.keep_xml,
+                        ),
+                        callback=lambda result, run=run: finished.put((run, result)),
+                        error_callback=lambda e, run=run: finished.put((run, e)),
                     )
-        print(f"Results saved in {results_dir}")
-        return self.results
+                    run.running += 1
+                    running += 1
+                    index += 1
+                if not running:
+                    break
+                run, result = finished.get()
+                running -= 1
+                run.running -= 1
+                if isinstance(result, BaseException):
+                    raise result
+                self._save_subset(run, *result)
+                if run.running == 0 and (run.stopped or run.queued == 0):
+                    self._finish_run(run)
+
+    def _save_subset(self, run, results, goal_states, measurements):
+        if run.experiment_id is None:
+            run.experiment_id = self.writer.create_experiment(
+                run.robot.name,
+                run.scenario.name,
+                run.ik.name,
+                self.start_time,
+                run.config_hash,
+                run.num_targets,
+                run.metadata,
+            )
+            run.summary.experiment_id = run.experiment_id
+        self.writer.append_results(run.experiment_id, results, goal_states)
+        self._update_run(run, results)
+        run.measurements.append(measurements)
+        if self.early_stopping is not None and not run.stopped:
+            if self.streaming:
+                self.writer.flush()
+                evaluated = database.load_results(run.experiment_id)
+            else:
+                evaluated = run.results[run.evaluated]
+            # blocks already in flight still finish, the count is printed at the end
+            run.stopped = self.early_stopping.converged(evaluated)
+
+    def _finish_run(self, run):
+        self.writer.complete_experiment(
+            run.experiment_id, int(run.evaluated.sum()), self._summarize(run)
+        )
+        if run.stopped:
+            print(
+                f"Stopped {run.ik.name} on robot {run.robot.name}, scenario {run.scenario.name} early after {int(run.evaluated.sum())} targets"
+            )
+        print(
+            f"Finished benchmark for {run.ik.name} on robot {run.robot.name}, scenario {run.scenario.name}"
+        )
+        if self.streaming:
+            results = run.summary
+        else:
+            results = run.results[run.evaluated]
+        if run.experiment_id is not None:
+            # only complete experiments go to the store, they never change again
+            self.writer.flush()
+            saved = (
+                database.load_results(run.experiment_id) if self.streaming else results
+            )
+            store.write_results(
+                run.experiment_id,
+                saved,
+                database.load_goal_states(run.experiment_id),
+            )
+            self.writer.submit(
+                insert_summary,
+                run.experiment_id,
+                ExperimentSummary.from_results(
+                    saved["reached"], saved["ik_time"], saved["solution_callback_count"]
+                ),
+            )
+        self.results[run.robot.name][run.scenario.name][run.ik.name] = results
+
+    @staticmethod
+    def _update_run(run, results):
+        if run.results is not None:
+            run.results[results["target"]] = results
+        run.evaluated[results["target"]] = True
+        run.summary.update(results)
+
+    @staticmethod
+    def _summarize(run):
+        if not run.measurements:
+            return None
+        measurements = [m for m in run.measurements if m["cpu_frequency"] is not None]
+        return {
+            "wall_time": sum(m["wall_time"] for m in run.measurements),
+            "cpu_time": sum(m["cpu_time"] for m in run.measurements),
+            "cpu_frequency": (
+                float(np.mean([m["cpu_frequency"] for m in measurements]))
+                if measurements
+                else None
+            ),
+            "cpu_frequency_min": (
+                min(m["cpu_frequency_min"] for m in measurements)
+                if measurements
+                else None
+            ),
+            "load_average": float(
+                np.mean([m["load_average"] for m in run.measurements])
+            ),
+        }
 
     def plot(self):
-        plot_results(self.results)
+        if not self.streaming:
+            plot_results(self.results)
+            return
+        # the summaries are not enough for plots, so the results are read back
+        # one robot at a time
+        for robot, robot_data in self.results.items():
+            results = {
+                robot: {
+                    scenario: {
+                        solver: database.load_results(summary.experiment_id)
+                        for solver, summary in scenario_data.items()
+                    }
+                    for scenario, scenario_data in robot_data.items()
+                }
+            }
+            plot_results(results)
 
     def print(self):
         print_results(self.results)
@@ -0,0 +1,434 @@
+# SPDX-License-Identifier: MIT
+import json
+import os
+import queue
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import Future
+
+import numpy as np
+from numpy.lib import recfunctions
+
+from ebike.utils import RESULT_DTYPE
+
+DB_FILE = "results.db"
+
+# environment columns of the experiments table that results can be selected by
+EXPERIMENT_FILTERS = (
+    "host",
+    "cpu_model",
+    "cpu_count",
+    "solver_version",
+    "scenario_hash",
+    "ik_timeout",
+    "parameters",
+    "config_hash",
+)
+
+_checked_db = None
+_shared_connections = {}
+
+
+def connect():
+    # other benchmark processes may hold the write lock for a whole batch
+    conn = sqlite3.connect(DB_FILE, timeout=60)
+    # WAL lets the plotting scripts read while a benchmark is writing
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+def shared_connection():
+    # one long-lived read connection per database and process for the
+    # reporting functions
+    key = (os.path.abspath(DB_FILE), os.getpid())
+    if key not in _shared_connections:
+        _shared_connections[key] = connect()
+    return _shared_connections[key]
+
+
+def add_missing_columns(cur, table, columns):
+    cur.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in cur.fetchall()}
+    for name, definition in columns.items():
+        if name not in existing:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+
+def _create_tables(cur):
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS experiments (id integer primary key, robot varchar(255), scenario varchar(255), solver varchar(255), time text)"
+    )
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS results (id integer primary key, experiment_id integer references experiments(id), reached integer, ik_time REAL, solution_callback_count integer)"
+    )
+
+
+def _add_run_columns(cur):
+    # experiments saved before checkpointing existed are always complete
+    add_missing_columns(
+        cur,
+        "experiments",
+        {
+            "config_hash": "varchar(64)",
+            "num_targets": "integer",
+            "complete": "integer default 1",
+            "evaluated_targets": "integer",
+            "wall_time": "REAL",
+            "cpu_time": "REAL",
+            "cpu_frequency": "REAL",
+            "cpu_frequency_min": "REAL",
+            "load_average": "REAL",
+            "host": "varchar(255)",
+            "cpu_model": "varchar(255)",
+            "cpu_count": "integer",
+            "solver_version": "varchar(255)",
+            "scenario_hash": "varchar(64)",
+            "ik_timeout": "REAL",
+            "parameters": "text",
+        },
+    )
+    add_missing_columns(cur, "results", {"target": "integer"})
+
+
+def _create_indexes(cur):
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS results_experiment_id ON results(experiment_id, target)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS experiments_cell ON experiments(robot, scenario, solver)"
+    )
+    for column in EXPERIMENT_FILTERS:
+        cur.execute(
+            f"CREATE INDEX IF NOT EXISTS experiments_{column} ON experiments({column})"
+        )
+
+
+def _create_store_id(cur):
+    # ties the columnar result store to this database, so a new results.db
+    # never picks up the arrays of an old one with the same experiment ids
+    cur.execute("CREATE TABLE IF NOT EXISTS store (id text)")
+    cur.execute("SELECT id FROM store")
+    if cur.fetchone() is None:
+        cur.execute("INSERT INTO store (id) VALUES (?)", (uuid.uuid4().hex,))
+
+
+def _add_goal_states(cur):
+    # joint solutions are stored as float64 blobs in the joint order of the
+    # experiment
+    add_missing_columns(cur, "results", {"goal_state": "blob"})
+    add_missing_columns(cur, "experiments", {"joint_names": "text"})
+
+
+def _create_summaries(cur):
+    # materialized per-experiment statistics, see ebike/summary.py
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS summaries (experiment_id integer primary key references experiments(id), num_results integer, reached integer, time_max REAL, iterations_max integer, time_mean REAL, time_mean_all REAL, iterations_mean REAL, time_p50 REAL, time_p90 REAL, time_p99 REAL, iteration_values blob, iteration_counts blob, sorted_times blob)"
+    )
+
+
+def _number_targets(cur):
+    # results saved before targets were recorded were inserted in target order
+    cur.execute(
+        "CREATE TEMP TABLE target_numbers (id integer primary key, target integer)"
+    )
+    cur.execute(
+        "INSERT INTO target_numbers SELECT id, ROW_NUMBER() OVER (PARTITION BY experiment_id ORDER BY id) - 1 FROM results WHERE target IS NULL"
+    )
+    cur.execute(
+        "UPDATE results SET target = (SELECT target FROM target_numbers WHERE target_numbers.id = results.id) WHERE target IS NULL"
+    )
+    cur.execute("DROP TABLE target_numbers")
+
+
+# Forward migrations, MIGRATIONS[i] upgrades a database from version i to i + 1.
+# Databases written before the schema was versioned are at version 0; since
+# they may already contain some of the later columns, all steps are idempotent.
+MIGRATIONS = [
+    _create_tables,
+    _add_run_columns,
+    _create_indexes,
+    _create_store_id,
+    _add_goal_states,
+    _create_summaries,
+    _number_targets,
+]
+
+
+def get_schema_version(cur):
+    cur.execute("CREATE TABLE IF NOT EXISTS schema_version (version integer)")
+    cur.execute("SELECT MAX(version) FROM schema_version")
+    return cur.fetchone()[0] or 0
+
+
+def ensure_db_exists():
+    global _checked_db
+    path = os.path.abspath(DB_FILE)
+    if _checked_db == path and os.path.exists(path):
+        return
+    with connect() as conn:
+        cur = conn.cursor()
+        version = get_schema_version(cur)
+        if version > len(MIGRATIONS):
+            raise RuntimeError(
+                f"{DB_FILE} has schema version {version}, but only {len(MIGRATIONS)} is supported"
+            )
+        for migration in MIGRATIONS[version:]:
+            migration(cur)
+            version += 1
+            cur.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
+            conn.commit()
+    _checked_db = path
+
+
+def get_store_id():
+    ensure_db_exists()
+    with connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM store")
+        return cur.fetchone()[0]
+
+
+def filter_clause(filters):
+    if not filters:
+        return "", []
+    for column in filters:
+        if column not in EXPERIMENT_FILTERS:
+            raise ValueError(f"Cannot filter experiments by {column}")
+    return "".join(f" AND {column} = ?" for column in filters), list(filters.values())
+
+
+def _insert_experiment(
+    cur,
+    robot,
+    scenario,
+    solver,
+    start_time,
+    config_hash=None,
+    num_targets=None,
+    metadata=None,
+):
+    columns = {
+        "robot": robot,
+        "scenario": scenario,
+        "solver": solver,
+        "time": start_time.isoformat(" ", "milliseconds"),
+        "config_hash": config_hash,
+        "num_targets": num_targets,
+        "complete": 0,
+    }
+    if metadata is not None:
+        columns.update(metadata)
+    sql = "INSERT INTO experiments ({}) VALUES ({})".format(
+        ", ".join(columns), ", ".join("?" * len(columns))
+    )
+    cur.execute(sql, list(columns.values()))
+    return cur.lastrowid
+
+
+def _insert_results(cur, experiment_id, results, goal_states=None):
+    if goal_states is None:
+        blobs = [None] * len(results)
+    else:
+        cur.execute(
+            "UPDATE experiments SET joint_names = ? WHERE id = ? AND joint_names IS NULL",
+            (json.dumps(goal_states.dtype.names), experiment_id),
+        )
+        blobs = [
+            row.tobytes()
+            for row in recfunctions.structured_to_unstructured(
+                goal_states, dtype=np.float64
+            )
+        ]
+    cur.executemany(
+        "INSERT INTO results (experiment_id, target, reached, ik_time, solution_callback_count, goal_state) VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (experiment_id, target, reached, ik_time, count, blob)
+            for (target, reached, ik_time, count), blob in zip(results.tolist(), blobs)
+        ),
+    )
+
+
+def _update_experiment(cur, experiment_id, evaluated_targets=None, measurements=None):
+    cur.execute(
+        "UPDATE experiments SET complete = 1, evaluated_targets = ? WHERE id = ?",
+        (evaluated_targets, experiment_id),
+    )
+    if measurements is not None:
+        cur.execute(
+            "UPDATE experiments SET wall_time = ?, cpu_time = ?, cpu_frequency = ?, cpu_frequency_min = ?, load_average = ? WHERE id = ?",
+            (
+                measurements["wall_time"],
+                measurements["cpu_time"],
+                measurements["cpu_frequency"],
+                measurements["cpu_frequency_min"],
+                measurements["load_average"],
+                experiment_id,
+            ),
+        )
+
+
+def create_experiment(*args, **kwargs):
+    ensure_db_exists()
+    with connect() as conn:
+        experiment_id = _insert_experiment(conn.cursor(), *args, **kwargs)
+        conn.commit()
+        return experiment_id
+
+
+def append_results(experiment_id, results, goal_states=None):
+    with connect() as conn:
+        _insert_results(conn.cursor(), experiment_id, results, goal_states)
+        conn.commit()
+
+
+def complete_experiment(experiment_id, evaluated_targets=None, measurements=None):
+    with connect() as conn:
+        _update_experiment(
+            conn.cursor(), experiment_id, evaluated_targets, measurements
+        )
+        conn.commit()
+
+
+class Writer:
+    # Owns the only connection of a benchmark to results.db. Writes are queued,
+    # applied in submission order by a background thread and everything that
+    # queued up in the meantime is committed in one transaction. The benchmark
+    # only waits for the disk when it needs a new experiment id or reads its own
+    # results back, and takes the database lock only once per batch.
+    def __init__(self):
+        ensure_db_exists()
+        self.queue = queue.Queue()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, function, *args):
+        if self.error is not None:
+            raise self.error
+        future = Future()
+        self.queue.put((future, function, args))
+        return future
+
+    def create_experiment(self, *args):
+        return self.submit(_insert_experiment, *args).result()
+
+    def append_results(self, experiment_id, results, goal_states=None):
+        self.submit(_insert_results, experiment_id, results, goal_states)
+
+    def complete_experiment(
+        self, experiment_id, evaluated_targets=None, measurements=None
+    ):
+        self.submit(_update_experiment, experiment_id, evaluated_targets, measurements)
+
+    def flush(self):
+        self.submit(lambda cur: None).result()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        try:
+            conn = connect()
+        except Exception as e:
+            # nothing can be written, every request fails until the writer is closed
+            self.error = e
+            request = self.queue.get()
+            while request is not None:
+                request[0].set_exception(e)
+                request = self.queue.get()
+            return
+        try:
+            stop = False
+            while not stop:
+                batch = [self.queue.get()]
+                while True:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if None in batch:
+                    stop = True
+                    batch = batch[: batch.index(None)]
+                self._write(conn, batch)
+        finally:
+            conn.close()
+
+    def _write(self, conn, batch):
+        cur = conn.cursor()
+        results = []
+        try:
+            for future, function, args in batch:
+                results.append(function(cur, *args))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            self.error = e
+            for future, _, _ in batch:
+                future.set_exception(e)
+            return
+        for (future, _, _), result in zip(batch, results):
+            future.set_result(result)
+
+
+def find_experiments(config_hash):
+    ensure_db_exists()
+    with connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT id, complete FROM experiments WHERE config_hash = ? ORDER BY id",
+            (config_hash,),
+        )
+        return cur.fetchall()
+
+
+def load_results(experiment_id):
+    # ensure_db_exists runs the migrations, which number the results of
+    # databases written before targets were recorded
+    ensure_db_exists()
+    with connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT target, reached, ik_time, solution_callback_count FROM results WHERE experiment_id = ? ORDER BY target",
+            (experiment_id,),
+        )
+        return np.array(cur.fetchall(), dtype=RESULT_DTYPE)
+
+
+def load_goal_states(experiment_id):
+    with connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT joint_names FROM experiments WHERE id = ?", (experiment_id,)
+        )
+        row = cur.fetchone()
+        if row is None or row[0] is None:
+            return None
+        joint_names = json.loads(row[0])
+        cur.execute(
+            "SELECT goal_state FROM results WHERE experiment_id = ? ORDER BY target",
+            (experiment_id,),
+        )
+        blobs = [blob for (blob,) in cur.fetchall()]
+    values = np.full((len(blobs), len(joint_names)), np.nan)
+    for i, blob in enumerate(blobs):
+        if blob is not None:
+            values[i] = np.frombuffer(blob, dtype=np.float64)
+    return recfunctions.unstructured_to_structured(
+        values, np.dtype([(name, np.float64) for name in joint_names])
+    )
+
+
+def save_result(robot, scenario, solver, start_time, result, config_hash=None):
+    experiment_id = create_experiment(
+        robot, scenario, solver, start_time, config_hash, len(result)
+    )
+    append_results(experiment_id, result)
+    complete_experiment(experiment_id, len(result))
+    return experiment_id
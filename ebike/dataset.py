@@ -0,0 +1,71 @@
+# SPDX-License-Identifier: MIT
+from ebike.database import ensure_db_exists, filter_clause, shared_connection
+from ebike.summary import load_summaries, load_target_results
+
+_datasets = {}
+
+
+class Dataset:
+    # Catalog of the complete experiments matching the filters, read with a
+    # single query. Summaries and per-target results are loaded in one query
+    # for everything that is prefetched and cached for the rest of the process.
+    def __init__(self, filters=None):
+        self.filters = filters
+        self.experiments = None
+
+    def _load(self):
+        if self.experiments is not None:
+            return
+        ensure_db_exists()
+        where, filter_values = filter_clause(self.filters)
+        cur = shared_connection().cursor()
+        cur.execute(
+            "SELECT robot, scenario, solver, id FROM experiments WHERE complete = 1"
+            + where
+            + " ORDER BY id",
+            filter_values,
+        )
+        self.experiments = {}
+        for robot, scenario, solver, experiment_id in cur.fetchall():
+            self.experiments.setdefault((robot, scenario, solver), []).append(
+                experiment_id
+            )
+
+    def cells(self):
+        # (scenario, robot) pairs in the order they were first run
+        self._load()
+        return list(dict.fromkeys((s, r) for r, s, _ in self.experiments))
+
+    def solvers(self, robot, scenario):
+        self._load()
+        return [
+            solver for r, s, solver in self.experiments if (r, s) == (robot, scenario)
+        ]
+
+    def experiment_ids(self, robot, scenario, solver, limit=None):
+        # newest first
+        self._load()
+        ids = self.experiments.get((robot, scenario, solver), [])[::-1]
+        return ids if limit is None else ids[:limit]
+
+    def summaries(self, experiment_ids):
+        return load_summaries(experiment_ids)
+
+    def prefetch(self, robot, scenarios, solvers, limit=None, results=False):
+        # the per-target results are only needed for confidence intervals
+        experiment_ids = [
+            experiment_id
+            for scenario in scenarios
+            for solver in solvers
+            for experiment_id in self.experiment_ids(robot, scenario, solver, limit)
+        ]
+        load_summaries(experiment_ids)
+        if results:
+            load_target_results(experiment_ids)
+
+
+def get_dataset(filters=None):
+    key = tuple(sorted((filters or {}).items()))
+    if key not in _datasets:
+        _datasets[key] = Dataset(filters)
+    return _datasets[key]
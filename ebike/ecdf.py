@@ -0,0 +1,67 @@
+# SPDX-License-Identifier: MIT
+import numpy as np
+
+# upper bound for the number of points a curve is evaluated at
+MAX_POINTS = 4000
+
+
+def evaluation_grid(sample_sets, upper=None, max_points=MAX_POINTS):
+    # Shared x values for curves that are averaged: every distinct sample if
+    # there are few enough, so the curves are exact, otherwise quantiles of all
+    # samples together, so the resolution follows the data instead of a fixed
+    # step up to the largest time.
+    samples = np.concatenate([np.ravel(s) for s in sample_sets] + [[0.0]])
+    if upper is not None:
+        samples = np.append(samples, upper)
+    grid = np.unique(samples)
+    if len(grid) > max_points:
+        grid = np.unique(
+            np.concatenate(
+                [
+                    np.quantile(samples, np.linspace(0, 1, max_points - 2)),
+                    grid[[0, -1]],
+                ]
+            )
+        )
+    return grid
+
+
+def ecdf(sorted_samples, grid, n):
+    # fraction of all n targets with a sample <= every grid point, samples of
+    # unreached targets are not passed in, so the curve ends at the success rate
+    return np.searchsorted(sorted_samples, grid, side="right") / n
+
+
+def envelope(curves):
+    # mean, min and max over repetitions
+    curves = np.vstack(curves)
+    return curves.mean(axis=0), curves.min(axis=0), curves.max(axis=0)
+
+
+def steps(sorted_samples, n, upper=None):
+    # corner points of the exact ECDF of one experiment, for
+    # plot(..., drawstyle="steps-post")
+    x = np.concatenate([[0.0], sorted_samples])
+    y = np.arange(len(x)) / n
+    if upper is not None:
+        x = np.append(x, upper)
+        y = np.append(y, y[-1])
+    return x, y
+
+
+def decimate(x, upper, columns):
+    # Indices of the corner points of steps-post curves on the sorted x values
+    # that are needed to draw them over [0, upper] at a resolution of the given
+    # number of columns: within a column only the first and the last corner
+    # are kept, so the jumps in between move by less than a column. The first
+    # point past upper is kept so that the curve reaches the edge of the plot.
+    x = np.asarray(x)
+    end = int(np.searchsorted(x, upper, side="right"))
+    if end == 0 or upper <= 0:
+        return np.arange(min(end + 1, len(x)))
+    column = np.floor(x[:end] * (columns / upper)).astype(np.int64)
+    change = column[1:] != column[:-1]
+    keep = np.flatnonzero(np.concatenate([[True], change]) | np.append(change, True))
+    if end < len(x):
+        keep = np.append(keep, end)
+    return keep
@@ -0,0 +1,64 @@
+# SPDX-License-Identifier: MIT
+import os
+import socket
+import xml.etree.ElementTree as ET
+
+from ament_index_python.resources import get_resource, get_resources
+
+from ebike.utils import file_hash
+
+PLUGIN_RESOURCE = "moveit_core__pluginlib__plugin"
+
+
+def get_cpu_model():
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.partition(":")[2].strip()
+    except OSError:
+        pass
+    return None
+
+
+def get_host_info():
+    return {
+        "host": socket.gethostname(),
+        "cpu_model": get_cpu_model(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _get_package_version(prefix, package):
+    try:
+        root = ET.parse(os.path.join(prefix, "share", package, "package.xml"))
+        return root.findtext("version")
+    except (OSError, ET.ParseError):
+        return None
+
+
+def get_solver_version(plugin_name):
+    # finds the library that exports the kinematics plugin through the pluginlib
+    # entries in the ament index
+    for package, prefix in get_resources(PLUGIN_RESOURCE).items():
+        content, _ = get_resource(PLUGIN_RESOURCE, package)
+        for description in content.split():
+            try:
+                root = ET.parse(os.path.join(prefix, description)).getroot()
+            except (OSError, ET.ParseError):
+                continue
+            for library in root.iter("library"):
+                names = [c.get("name") or c.get("type") for c in library.iter("class")]
+                if plugin_name not in names:
+                    continue
+                library_name = os.path.basename(library.get("path"))
+                if not library_name.startswith("lib"):
+                    library_name = "lib" + library_name
+                library_file = os.path.join(prefix, "lib", library_name + ".so")
+                version = _get_package_version(prefix, package)
+                try:
+                    library_hash = file_hash(library_file)[:12]
+                except OSError:
+                    library_hash = "unknown"
+                return f"{package} {version} {library_hash}"
+    return None
@@ -0,0 +1,321 @@
+# SPDX-License-Identifier: MIT
+import hashlib
+import itertools
+import json
+import os
+
+import numpy as np
+
+from ebike.scenario import AbstractScenario, resolve_uri, write_pcd, write_ply
+
+GENERATED_DIR = "generated_scenarios"
+PCD_FIELDS = ["x", "y", "z", "normal_x", "normal_y", "normal_z", "curvature"]
+
+# Parameters of every family with their defaults, in meters and radians. The
+# defaults resemble the scenes in scenarios/. Every family is built around the
+# origin with its open side facing -x and then placed at x, y, z rotated by yaw
+# around the z axis of the robot base.
+POSE = {"x": 0.0, "y": 0.0, "z": 0.0, "yaw": 0.0, "targets": 1000, "seed": 0}
+FAMILIES = {
+    "Table": {
+        "width": 1.0,
+        "depth": 0.96,
+        "height": 0.74,
+        "thickness": 0.04,
+        "leg": 0.05,
+        **POSE,
+        "y": 0.98,
+        "yaw": np.pi / 2,
+    },
+    "TableObjects": {
+        "width": 0.5,
+        "depth": 0.48,
+        "height": 0.37,
+        "thickness": 0.02,
+        "leg": 0.03,
+        "objects": 5,
+        "object_size": 0.06,
+        "object_height": 0.09,
+        **POSE,
+        "y": 0.59,
+        "yaw": np.pi / 2,
+    },
+    "Shelf": {
+        "width": 0.94,
+        "depth": 0.47,
+        "height": 0.87,
+        "shelves": 2,
+        "thickness": 0.02,
+        **POSE,
+        "x": 0.565,
+    },
+    "Barrel": {
+        "radius": 0.16,
+        "depth": 0.35,
+        "segments": 16,
+        **POSE,
+        "y": 0.5,
+    },
+}
+
+# generated scenario classes by name
+SCENARIOS = {}
+
+
+def _merge(parts):
+    # concatenates (vertices, faces) meshes
+    vertices = [v for v, _ in parts]
+    offsets = np.cumsum([0] + [len(v) for v in vertices[:-1]])
+    faces = [f + offset for (_, f), offset in zip(parts, offsets)]
+    return np.concatenate(vertices), np.concatenate(faces)
+
+
+def _quads(corners):
+    # (n, 4, 3) quad corners as vertices and two triangles per quad
+    base = 4 * np.arange(len(corners))[:, None]
+    return corners.reshape(-1, 3), np.concatenate([base + [0, 1, 2], base + [0, 2, 3]])
+
+
+def _orient(vertices, faces, direction):
+    # flips the triangles whose normal points away from the direction
+    t = vertices[faces]
+    normals = np.cross(t[:, 1] - t[:, 0], t[:, 2] - t[:, 0])
+    flip = np.sum(normals * direction, axis=-1) < 0
+    faces = faces.copy()
+    faces[flip] = faces[flip][:, ::-1]
+    return vertices, faces
+
+
+def _box(lo, hi):
+    # axis-aligned box with the faces facing outwards
+    lo = np.asarray(lo, dtype=float)
+    hi = np.asarray(hi, dtype=float)
+    corners = []
+    for axis in range(3):
+        u, v = [a for a in range(3) if a != axis]
+        for side in (lo, hi):
+            quad = np.empty((4, 3))
+            quad[:, axis] = side[axis]
+            quad[:, u] = [lo[u], hi[u], hi[u], lo[u]]
+            quad[:, v] = [lo[v], lo[v], hi[v], hi[v]]
+            corners.append(quad)
+    vertices, faces = _quads(np.array(corners))
+    return _orient(vertices, faces, vertices[faces].mean(axis=1) - (lo + hi) / 2)
+
+
+def _top(lo, hi):
+    # upper face of an axis-aligned box
+    vertices, faces = _box(lo, hi)
+    return vertices, faces[vertices[faces][:, :, 2].min(axis=1) >= hi[2]]
+
+
+def _table(width, depth, height, thickness, leg):
+    top = (
+        [-depth / 2, -width / 2, height - thickness],
+        [depth / 2, width / 2, height],
+    )
+    parts = [_box(*top)]
+    for sx, sy in itertools.product((-1, 1), repeat=2):
+        x = sx * (depth / 2 - leg)
+        y = sy * (width / 2 - leg)
+        parts.append(
+            _box(
+                [x - leg / 2, y - leg / 2, 0],
+                [x + leg / 2, y + leg / 2, height - thickness],
+            )
+        )
+    return parts, [_top(*top)]
+
+
+def table(width, depth, height, thickness, leg, **_):
+    return _table(width, depth, height, thickness, leg)
+
+
+def table_objects(
+    width,
+    depth,
+    height,
+    thickness,
+    leg,
+    objects,
+    object_size,
+    object_height,
+    seed,
+    **_,
+):
+    # boxes at random positions on a table, targets on their sides and tops
+    parts, _ = _table(width, depth, height, thickness, leg)
+    rng = np.random.default_rng(seed)
+    margin = np.array([depth, width]) / 2 - object_size
+    targets = []
+    for x, y in rng.uniform(-margin, margin, size=(objects, 2)):
+        vertices, faces = _box(
+            [x - object_size / 2, y - object_size / 2, height],
+            [x + object_size / 2, y + object_size / 2, height + object_height],
+        )
+        parts.append((vertices, faces))
+        targets.append((vertices, faces[vertices[faces][:, :, 2].max(axis=1) > height]))
+    return parts, targets
+
+
+def shelf(width, depth, height, shelves, thickness, **_):
+    # open towards -x, targets on the upper faces of the boards
+    x0, x1 = -depth / 2, depth / 2
+    y0, y1 = -width / 2, width / 2
+    parts = [
+        _box([x0, y0, 0], [x1, y0 + thickness, height]),
+        _box([x0, y1 - thickness, 0], [x1, y1, height]),
+        _box([x1 - thickness, y0, 0], [x1, y1, height]),
+        _box([x0, y0, height - thickness], [x1, y1, height]),
+    ]
+    targets = []
+    for z in np.arange(shelves) * (height - thickness) / shelves:
+        board = (
+            [x0, y0 + thickness, z],
+            [x1 - thickness, y1 - thickness, z + thickness],
+        )
+        parts.append(_box(*board))
+        targets.append(_top(*board))
+    return parts, targets
+
+
+def barrel(radius, depth, segments, **_):
+    # open cylinder, targets on the inside of the wall and on the bottom
+    angles = np.linspace(0, 2 * np.pi, segments + 1)
+    ring = np.stack([np.cos(angles), np.sin(angles), np.zeros_like(angles)], 1)
+    ring *= radius
+    up = np.array([0, 0, depth])
+    wall = np.stack([ring[:-1], ring[1:], ring[1:] + up, ring[:-1] + up], 1)
+    vertices, faces = _quads(wall)
+    inside = _orient(vertices, faces, -vertices[faces].mean(axis=1) * [1, 1, 0])
+    k = np.arange(segments)
+    bottom = _orient(
+        np.vstack([[0, 0, 0], ring[:-1]]),
+        np.stack([np.zeros_like(k), k + 1, (k + 1) % segments + 1], 1),
+        [0, 0, 1],
+    )
+    return [inside, bottom], [inside, bottom]
+
+
+BUILDERS = {
+    "Table": table,
+    "TableObjects": table_objects,
+    "Shelf": shelf,
+    "Barrel": barrel,
+}
+
+
+def sample_surface(vertices, faces, count, rng):
+    # points uniformly distributed over the area of the triangles, with the
+    # normals of their triangles and zero curvature like the PCL clouds
+    t = vertices[faces]
+    cross = np.cross(t[:, 1] - t[:, 0], t[:, 2] - t[:, 0])
+    areas = np.linalg.norm(cross, axis=1)
+    chosen = rng.choice(len(faces), size=count, p=areas / areas.sum())
+    u, v = rng.random((2, count))
+    outside = u + v > 1
+    u[outside], v[outside] = 1 - u[outside], 1 - v[outside]
+    t = t[chosen]
+    points = (
+        t[:, 0] + u[:, None] * (t[:, 1] - t[:, 0]) + v[:, None] * (t[:, 2] - t[:, 0])
+    )
+    normals = cross[chosen] / areas[chosen, None]
+    return np.hstack([points, normals, np.zeros((count, 1))]).astype(np.float32)
+
+
+def _place(vertices, x, y, z, yaw, **_):
+    c, s = np.cos(yaw), np.sin(yaw)
+    rotation = np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]])
+    return vertices @ rotation.T + [x, y, z]
+
+
+def build(family, parameters):
+    # collision mesh and target cloud of a family for complete parameters
+    collision, targets = BUILDERS[family](**parameters)
+    vertices, faces = _merge(collision)
+    target_vertices, target_faces = _merge(targets)
+    points = sample_surface(
+        _place(target_vertices, **parameters),
+        target_faces,
+        parameters["targets"],
+        np.random.default_rng(parameters["seed"]),
+    )
+    return _place(vertices, **parameters), faces, points
+
+
+class GeneratedScenario(AbstractScenario):
+    family = None
+    parameters = None
+    directory = None
+
+    def __reduce__(self):
+        # the classes only exist in the process that generated them, spawned
+        # benchmark workers create them again from the parameters
+        return (
+            make_scenario,
+            (self.family, self.parameters, self.directory),
+            self.__dict__,
+        )
+
+    @property
+    def ply_file(self):
+        # REACH loads the collision mesh through resource_retriever, which
+        # needs a URI
+        path = os.path.abspath(os.path.join(self.directory, f"{type(self).name}.ply"))
+        return "file://" + path
+
+    @property
+    def pcd_file(self):
+        return os.path.abspath(os.path.join(self.directory, f"{type(self).name}.pcd"))
+
+
+def make_scenario(family, parameters=None, directory=GENERATED_DIR):
+    # Scenario of a family for the given parameters, the remaining ones use
+    # the defaults. The name is derived from the parameters, so the files of
+    # a scenario are only generated once.
+    if family not in FAMILIES:
+        raise ValueError(f"Unknown scenario family {family}")
+    unknown = set(parameters or {}) - set(FAMILIES[family])
+    if unknown:
+        raise ValueError(f"Unknown parameters {sorted(unknown)} for {family}")
+    # values are converted to the type of their default, so that e.g. 3 and
+    # "3.0" give the same scenario
+    parameters = {
+        name: type(default)(float((parameters or {}).get(name, default)))
+        for name, default in FAMILIES[family].items()
+    }
+    digest = hashlib.sha256(
+        json.dumps([family, parameters], sort_keys=True).encode()
+    ).hexdigest()
+    name = f"{family}_{digest[:10]}"
+    if name not in SCENARIOS:
+        SCENARIOS[name] = type(
+            name,
+            (GeneratedScenario,),
+            {
+                "name": name,
+                "family": family,
+                "parameters": parameters,
+                "directory": directory,
+            },
+        )
+    scenario = SCENARIOS[name]()
+    if not os.path.exists(scenario.pcd_file):
+        os.makedirs(directory, exist_ok=True)
+        vertices, faces, points = build(family, parameters)
+        write_ply(resolve_uri(scenario.ply_file), vertices, faces)
+        with open(os.path.join(directory, f"{name}.json"), "w") as f:
+            json.dump({"family": family, "parameters": parameters}, f, indent=1)
+        # the target cloud is written last, it marks complete scenarios
+        write_pcd(scenario.pcd_file + ".tmp", PCD_FIELDS, points, "binary")
+        os.replace(scenario.pcd_file + ".tmp", scenario.pcd_file)
+    return scenario
+
+
+def generate_scenarios(family, sweep, directory=GENERATED_DIR):
+    # one scenario for every combination of the values of the swept parameters
+    names = list(sweep)
+    return [
+        make_scenario(family, dict(zip(names, values)), directory)
+        for values in itertools.product(*(sweep[name] for name in names))
+    ]
@@ -8,26 +8,24 @@ IK_TIMEOUT = 1.0
 class AbstractIK:
     name = None
 
-    def set_config(self, planning_group):
+    def get_parameters(self, planning_group):
         raise NotImplementedError
 
+    def set_config(self, planning_group):
+        for name, value in self.get_parameters(planning_group).items():
+            reach_ros.set_parameter(name, value)
+
 
 class KDL(AbstractIK):
     name = "KDL"
 
-    def set_config(self, planning_group):
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver",
-            "kdl_kinematics_plugin/KDLKinematicsPlugin",
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver_search_resolution",
-            0.001,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver_timeout",
-            IK_TIMEOUT,
-        )
+    def get_parameters(self, planning_group):
+        prefix = f"robot_description_kinematics.{planning_group}"
+        return {
+            f"{prefix}.kinematics_solver": "kdl_kinematics_plugin/KDLKinematicsPlugin",
+            f"{prefix}.kinematics_solver_search_resolution": 0.001,
+            f"{prefix}.kinematics_solver_timeout": IK_TIMEOUT,
+        }
 
 
 class RelaxedIK(AbstractIK):
@@ -40,189 +38,115 @@ class RelaxedIK(AbstractIK):
         else:
             self.opt_solver_name = "LD_SLSQP"
 
-    def set_config(self, planning_group):
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver",
-            "relaxed_ik/RelaxedIkPlugin",
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver_search_resolution",
-            0.001,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver_timeout",
-            IK_TIMEOUT,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.opt_solver",
-            self.opt_solver_name,
-        )
-        reach_ros.set_parameter("reach_ros.use_rcm", False)
-        reach_ros.set_parameter("reach_ros.use_rcm2", False)
-        reach_ros.set_parameter("reach_ros.use_rcm3", False)
-        reach_ros.set_parameter("reach_ros.use_depth", False)
-        reach_ros.set_parameter("reach_ros.use_depth2", False)
-        reach_ros.set_parameter("reach_ros.use_collision_distance", False)
-        reach_ros.set_parameter("reach_ros.use_collision_distance2", False)
-        reach_ros.set_parameter("reach_ros.use_line_goal", False)
-        reach_ros.set_parameter("reach_ros.use_line_alignment", False)
-        reach_ros.set_parameter("reach_ros.empty_cost_fn", False)
-        reach_ros.set_parameter("reach_ros.scan_goal", False)
+    def get_parameters(self, planning_group):
+        prefix = f"robot_description_kinematics.{planning_group}"
+        return {
+            f"{prefix}.kinematics_solver": "relaxed_ik/RelaxedIkPlugin",
+            f"{prefix}.kinematics_solver_search_resolution": 0.001,
+            f"{prefix}.kinematics_solver_timeout": IK_TIMEOUT,
+            f"{prefix}.opt_solver": self.opt_solver_name,
+            "reach_ros.use_rcm": False,
+            "reach_ros.use_rcm2": False,
+            "reach_ros.use_rcm3": False,
+            "reach_ros.use_depth": False,
+            "reach_ros.use_depth2": False,
+            "reach_ros.use_collision_distance": False,
+            "reach_ros.use_collision_distance2": False,
+            "reach_ros.use_line_goal": False,
+            "reach_ros.use_line_alignment": False,
+            "reach_ros.empty_cost_fn": False,
+            "reach_ros.scan_goal": False,
+        }
 
 
 class TracIK(AbstractIK):
     name = "TracIK"
 
-    def set_config(self, planning_group):
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver",
-            "trac_ik_kinematics_plugin/TRAC_IKKinematicsPlugin",
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver_search_resolution",
-            0.001,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver_timeout",
-            IK_TIMEOUT,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.solve_type", "Speed"
-        )
+    def get_parameters(self, planning_group):
+        prefix = f"robot_description_kinematics.{planning_group}"
+        return {
+            f"{prefix}.kinematics_solver": "trac_ik_kinematics_plugin/TRAC_IKKinematicsPlugin",
+            f"{prefix}.kinematics_solver_search_resolution": 0.001,
+            f"{prefix}.kinematics_solver_timeout": IK_TIMEOUT,
+            f"{prefix}.solve_type": "Speed",
+        }
 
 
 class TracIKDistance(AbstractIK):
     name = "TracIKDistance"
 
-    def set_config(self, planning_group):
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver",
-            "trac_ik_kinematics_plugin/TRAC_IKKinematicsPlugin",
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver_search_resolution",
-            0.001,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver_timeout",
-            IK_TIMEOUT,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.solve_type", "Distance"
-        )
+    def get_parameters(self, planning_group):
+        prefix = f"robot_description_kinematics.{planning_group}"
+        return {
+            f"{prefix}.kinematics_solver": "trac_ik_kinematics_plugin/TRAC_IKKinematicsPlugin",
+            f"{prefix}.kinematics_solver_search_resolution": 0.001,
+            f"{prefix}.kinematics_solver_timeout": IK_TIMEOUT,
+            f"{prefix}.solve_type": "Distance",
+        }
 
 
 class PickIK(AbstractIK):
     name = "PickIK"
 
-    def set_config(self, planning_group):
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver",
-            "pick_ik/PickIkPlugin",
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver_search_resolution",
-            0.001,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver_timeout",
-            IK_TIMEOUT,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.mode", "global"
-        )
-        # reach_ros.set_parameter(
-        #    f"robot_description_kinematics.{planning_group}.memetic_population_size", 93
-        # )
-        # reach_ros.set_parameter(
-        #    f"robot_description_kinematics.{planning_group}.memetic_elite_size", 65
-        # )
-        # reach_ros.set_parameter(
-        #    f"robot_description_kinematics.{planning_group}.memetic_wipeout_fitness_tol", 0.02856
-        # )
-        # reach_ros.set_parameter(
-        #    f"robot_description_kinematics.{planning_group}.memetic_max_generations", 56
-        # )
-        # reach_ros.set_parameter(
-        #    f"robot_description_kinematics.{planning_group}.memetic_gd_max_iters", 66
-        # )
-        # reach_ros.set_parameter(
-        #    f"robot_description_kinematics.{planning_group}.memetic_gd_max_time", 0.004159
-        # )
-        # reach_ros.set_parameter(
-        #    f"robot_description_kinematics.{planning_group}.gd_step_size", 2.3659e-6
-        # )
-        # reach_ros.set_parameter(
-        #    f"robot_description_kinematics.{planning_group}.gd_min_cost_delta", 1.0e-12
-        # )
-        # reach_ros.set_parameter(
-        #    f"robot_description_kinematics.{planning_group}.cost_threshold", 10000.0
-        # )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.stop_optimization_on_first_solution",
-            True,
-        )
+    def get_parameters(self, planning_group):
+        prefix = f"robot_description_kinematics.{planning_group}"
+        return {
+            f"{prefix}.kinematics_solver": "pick_ik/PickIkPlugin",
+            f"{prefix}.kinematics_solver_search_resolution": 0.001,
+            f"{prefix}.kinematics_solver_timeout": IK_TIMEOUT,
+            f"{prefix}.mode": "global",
+            # f"{prefix}.memetic_population_size": 93,
+            # f"{prefix}.memetic_elite_size": 65,
+            # f"{prefix}.memetic_wipeout_fitness_tol": 0.02856,
+            # f"{prefix}.memetic_max_generations": 56,
+            # f"{prefix}.memetic_gd_max_iters": 66,
+            # f"{prefix}.memetic_gd_max_time": 0.004159,
+            # f"{prefix}.gd_step_size": 2.3659e-6,
+            # f"{prefix}.gd_min_cost_delta": 1.0e-12,
+            # f"{prefix}.cost_threshold": 10000.0,
+            f"{prefix}.stop_optimization_on_first_solution": True,
+        }
 
 
 class PickIKLocal(PickIK):
     name = "PickIKLocal"
 
-    def set_config(self, planning_group):
-        super().set_config(planning_group)
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.mode", "local"
-        )
+    def get_parameters(self, planning_group):
+        parameters = super().get_parameters(planning_group)
+        parameters[f"robot_description_kinematics.{planning_group}.mode"] = "local"
+        return parameters
 
 
 class BioIK(AbstractIK):
     name = "BioIK"
     mode = "bio2_memetic"
 
-    def set_config(self, planning_group):
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver",
-            "bio_ik/BioIKKinematicsPlugin",
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver_search_resolution",
-            0.001,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver_timeout",
-            IK_TIMEOUT,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver_attempts",
-            1,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.mode", self.mode
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.population_size2", 2
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.child_count", 16
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.memetic_opt_gens", 8
-        )
-        reach_ros.set_parameter("reach_ros.use_rcm", False)
-        reach_ros.set_parameter("reach_ros.use_rcm3", False)
-        reach_ros.set_parameter("reach_ros.use_depth", False)
-        reach_ros.set_parameter("reach_ros.use_depth2", False)
-        reach_ros.set_parameter("reach_ros.use_collision_distance", False)
-        reach_ros.set_parameter("reach_ros.use_collision_distance2", False)
-        reach_ros.set_parameter("reach_ros.use_line_goal", False)
-        reach_ros.set_parameter("reach_ros.use_line_alignment", False)
-        reach_ros.set_parameter("reach_ros.use_look_at", False)
-        reach_ros.set_parameter("reach_ros.empty_cost_fn", False)
-        reach_ros.set_parameter("reach_ros.scan_goal", False)
-        reach_ros.set_parameter("reach_ros.scan_with_offset", False)
-        reach_ros.set_parameter("reach_ros.scan_swamp", False)
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.keep_seed", False
-        )
+    def get_parameters(self, planning_group):
+        prefix = f"robot_description_kinematics.{planning_group}"
+        return {
+            f"{prefix}.kinematics_solver": "bio_ik/BioIKKinematicsPlugin",
+            f"{prefix}.kinematics_solver_search_resolution": 0.001,
+            f"{prefix}.kinematics_solver_timeout": IK_TIMEOUT,
+            f"{prefix}.kinematics_solver_attempts": 1,
+            f"{prefix}.mode": self.mode,
+            f"{prefix}.population_size2": 2,
+            f"{prefix}.child_count": 16,
+            f"{prefix}.memetic_opt_gens": 8,
+            "reach_ros.use_rcm": False,
+            "reach_ros.use_rcm3": False,
+            "reach_ros.use_depth": False,
+            "reach_ros.use_depth2": False,
+            "reach_ros.use_collision_distance": False,
+            "reach_ros.use_collision_distance2": False,
+            "reach_ros.use_line_goal": False,
+            "reach_ros.use_line_alignment": False,
+            "reach_ros.use_look_at": False,
+            "reach_ros.empty_cost_fn": False,
+            "reach_ros.scan_goal": False,
+            "reach_ros.scan_with_offset": False,
+            "reach_ros.scan_swamp": False,
+            f"{prefix}.keep_seed": False,
+        }
 
 
 class BioIK2MemeticL(BioIK):
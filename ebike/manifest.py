@@ -0,0 +1,74 @@
+# SPDX-License-Identifier: MIT
+import hashlib
+import json
+import os
+import sys
+
+# Every rendered output prefix gets a manifest next to it with the inputs it was
+# rendered from, so that figures and tables whose inputs did not change can be
+# skipped.
+MANIFEST_SUFFIX = ".manifest.json"
+# modules whose changes can change the rendered outputs, together with the
+# script that renders them
+RENDER_MODULES = (
+    "visualization.py",
+    "ecdf.py",
+    "dataset.py",
+    "summary.py",
+    "stats.py",
+    "database.py",
+    "store.py",
+    "manifest.py",
+    "utils.py",
+)
+
+_code_version = None
+
+
+def code_version():
+    global _code_version
+    if _code_version is None:
+        files = [
+            os.path.join(os.path.dirname(__file__), module) for module in RENDER_MODULES
+        ]
+        script = getattr(sys.modules["__main__"], "__file__", None)
+        if script is not None:
+            files.append(script)
+        h = hashlib.sha256()
+        for file_name in files:
+            with open(file_name, "rb") as f:
+                h.update(f.read())
+        _code_version = h.hexdigest()
+    return _code_version
+
+
+def fingerprint(experiment_ids, config):
+    # experiment_ids maps a name of every plotted cell to its experiment ids
+    # and config holds the settings the output was rendered with; both are
+    # normalized to their JSON form so they compare equal to a loaded manifest
+    return json.loads(
+        json.dumps(
+            {
+                "experiments": experiment_ids,
+                "config": config,
+                "code_version": code_version(),
+            }
+        )
+    )
+
+
+def is_up_to_date(output_prefix, inputs):
+    try:
+        with open(output_prefix + MANIFEST_SUFFIX, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    outputs = manifest.pop("outputs", [])
+    return manifest == inputs and all(os.path.exists(output) for output in outputs)
+
+
+def write_manifest(output_prefix, inputs, outputs):
+    file_name = output_prefix + MANIFEST_SUFFIX
+    with open(file_name + ".tmp", "w") as f:
+        json.dump({**inputs, "outputs": list(outputs)}, f, indent=1)
+    os.replace(file_name + ".tmp", file_name)
@@ -9,9 +9,16 @@ from ebike.utils import get_xacro
 class AbstractRobot:
     name = None
 
-    def set_config(self):
+    def get_description(self):
         raise NotImplementedError
 
+    def set_config(self):
+        robot_description, robot_description_semantic = self.get_description()
+        reach_ros.set_parameter("robot_description", robot_description)
+        reach_ros.set_parameter(
+            "robot_description_semantic", robot_description_semantic
+        )
+
     def get_planning_group(self):
         raise NotImplementedError
 
@@ -19,7 +26,7 @@ class AbstractRobot:
 class UR10(AbstractRobot):
     name = "UR10"
 
-    def set_config(self):
+    def get_description(self):
         xacro_file = (
             get_package_share_directory("ur_description") + "/urdf/ur.urdf.xacro"
         )
@@ -30,10 +37,7 @@ class UR10(AbstractRobot):
         robot_description_semantic = get_xacro(
             semantic_file, {"name": "ur", "ur_type": "ur10"}
         )
-        reach_ros.set_parameter("robot_description", robot_description)
-        reach_ros.set_parameter(
-            "robot_description_semantic", robot_description_semantic
-        )
+        return robot_description, robot_description_semantic
 
     def get_planning_group(self):
         return "ur_manipulator"
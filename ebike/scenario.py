@@ -1,4 +1,272 @@
 # SPDX-License-Identifier: MIT
+import hashlib
+import json
+import os.path
+import tempfile
+
+import numpy as np
+
+from ebike.subsampling import subsample
+from ebike.utils import file_hash
+
+SUBSAMPLE_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "ebike", "targets"
+)
+
+
+def resolve_uri(uri):
+    if uri.startswith("package://"):
+        # imported here so that the file formats can be used without ROS
+        from ament_index_python.packages import get_package_share_directory
+
+        package, _, path = uri[len("package://") :].partition("/")
+        return os.path.join(get_package_share_directory(package), path)
+    if uri.startswith("file://"):
+        return uri[len("file://") :]
+    return uri
+
+
+PCD_TYPES = {"F": "f", "I": "i", "U": "u"}
+PLY_TYPES = {
+    "char": "i1",
+    "int8": "i1",
+    "uchar": "u1",
+    "uint8": "u1",
+    "short": "i2",
+    "int16": "i2",
+    "ushort": "u2",
+    "uint16": "u2",
+    "int": "i4",
+    "int32": "i4",
+    "uint": "u4",
+    "uint32": "u4",
+    "float": "f4",
+    "float32": "f4",
+    "double": "f8",
+    "float64": "f8",
+}
+
+
+def _read_header(f, last_key, file_name):
+    # header lines up to and including the line starting with last_key, and
+    # the offset of the data after it
+    header = []
+    for line in f:
+        line = line.decode("ascii").strip()
+        if line.startswith("#") or line.startswith("comment") or not line:
+            continue
+        header.append(line.split())
+        if header[-1][0] == last_key:
+            return header, f.tell()
+    raise ValueError(f"Missing {last_key} in the header of {file_name}")
+
+
+def _lzf_decompress(data, size):
+    # the LZF format used by binary_compressed PCD files: literal runs and
+    # back references into the output
+    out = bytearray(size)
+    i = o = 0
+    while i < len(data):
+        control = data[i]
+        i += 1
+        if control < 32:
+            length = control + 1
+            if i + length > len(data) or o + length > size:
+                raise ValueError("Corrupt LZF data")
+            out[o : o + length] = data[i : i + length]
+            i += length
+            o += length
+            continue
+        length = control >> 5
+        if i + (length == 7) >= len(data):
+            raise ValueError("Corrupt LZF data")
+        if length == 7:
+            length += data[i]
+            i += 1
+        length += 2
+        ref = o - ((control & 0x1F) << 8) - data[i] - 1
+        i += 1
+        end = o + length
+        if ref < 0 or end > size:
+            raise ValueError("Corrupt LZF data")
+        # overlapping references repeat the bytes between ref and o
+        while o < end:
+            chunk = min(end - o, o - ref)
+            out[o : o + chunk] = out[ref : ref + chunk]
+            o += chunk
+    if o != size:
+        raise ValueError("Corrupt LZF data")
+    return bytes(out)
+
+
+def read_pcd(file_name):
+    # binary data is memory-mapped and returned without copying if all fields
+    # are 32 bit floats, so the points may be read-only
+    with open(file_name, "rb") as f:
+        header, offset = _read_header(f, "DATA", file_name)
+    header = {line[0]: line[1:] for line in header}
+    fields = header["FIELDS"]
+    counts = [int(c) for c in header.get("COUNT", ["1"] * len(fields))]
+    types = [
+        np.dtype(f"<{PCD_TYPES[t]}{size}")
+        for t, size in zip(header["TYPE"], header["SIZE"])
+    ]
+    num_points = int(header["POINTS"][0])
+    data = header["DATA"][0]
+    fields = [
+        field if count == 1 else f"{field}_{i}"
+        for field, count in zip(fields, counts)
+        for i in range(count)
+    ]
+    if data == "ascii":
+        with open(file_name, "rb") as f:
+            f.seek(offset)
+            points = np.loadtxt(f, dtype=np.float32, ndmin=2)
+        return fields, points
+    buffer = np.memmap(file_name, dtype=np.uint8, mode="r")
+    if data == "binary":
+        if all(t == np.dtype("<f4") for t in types):
+            points = np.frombuffer(
+                buffer, dtype="<f4", count=num_points * len(fields), offset=offset
+            )
+            return fields, points.reshape(num_points, len(fields))
+        dtype = np.dtype(
+            [(f"f{i}", t, (c,)) for i, (t, c) in enumerate(zip(types, counts))]
+        )
+        records = np.frombuffer(buffer, dtype=dtype, count=num_points, offset=offset)
+        columns = [records[name].astype(np.float32) for name in dtype.names]
+    elif data == "binary_compressed":
+        # a compressed and an uncompressed size followed by the LZF compressed
+        # points, stored field by field
+        compressed_size, size = np.frombuffer(buffer, "<u4", count=2, offset=offset)
+        start = offset + 8
+        raw = _lzf_decompress(buffer[start : start + compressed_size].tobytes(), size)
+        columns = []
+        position = 0
+        for t, c in zip(types, counts):
+            column = np.frombuffer(raw, t, count=num_points * c, offset=position)
+            columns.append(column.reshape(num_points, c).astype(np.float32))
+            position += column.nbytes
+    else:
+        raise ValueError(f"Unsupported PCD data type {data} in {file_name}")
+    return fields, np.hstack(columns) if columns else np.empty((num_points, 0))
+
+
+def write_pcd(file_name, fields, points, data="ascii"):
+    with open(file_name, "wb") as f:
+        f.write(
+            "".join(
+                [
+                    "# .PCD v0.7 - Point Cloud Data file format\n",
+                    "VERSION 0.7\n",
+                    f"FIELDS {' '.join(fields)}\n",
+                    f"SIZE {' '.join(['4'] * len(fields))}\n",
+                    f"TYPE {' '.join(['F'] * len(fields))}\n",
+                    f"COUNT {' '.join(['1'] * len(fields))}\n",
+                    f"WIDTH {len(points)}\n",
+                    "HEIGHT 1\n",
+                    "VIEWPOINT 0 0 0 1 0 0 0\n",
+                    f"POINTS {len(points)}\n",
+                    f"DATA {data}\n",
+                ]
+            ).encode("ascii")
+        )
+        if data == "ascii":
+            np.savetxt(f, points, fmt="%.9g")
+        elif data == "binary":
+            f.write(np.ascontiguousarray(points, dtype="<f4").tobytes())
+        else:
+            raise ValueError(f"Unsupported PCD data type {data}")
+
+
+def read_ply(file_name):
+    # Vertices of a binary PLY file as a memory-mapped structured array with a
+    # field per property, and faces as an (n, k) array of vertex indices, or a
+    # list of arrays if the faces have different numbers of vertices.
+    with open(file_name, "rb") as f:
+        header, offset = _read_header(f, "end_header", file_name)
+    if header[0] != ["ply"] or header[1][0] != "format":
+        raise ValueError(f"{file_name} is not a PLY file")
+    if header[1][1] == "binary_little_endian":
+        byte_order = "<"
+    elif header[1][1] == "binary_big_endian":
+        byte_order = ">"
+    else:
+        raise ValueError(f"Unsupported PLY format {header[1][1]} in {file_name}")
+    elements = []
+    for line in header[2:]:
+        if line[0] == "element":
+            elements.append((line[1], int(line[2]), []))
+        elif line[0] == "property":
+            elements[-1][2].append(line[1:])
+    buffer = np.memmap(file_name, dtype=np.uint8, mode="r")
+    vertices = faces = None
+    for name, count, properties in elements:
+        if all(p[0] != "list" for p in properties):
+            dtype = np.dtype([(p[1], byte_order + PLY_TYPES[p[0]]) for p in properties])
+            values = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+            offset += values.nbytes
+        elif len(properties) == 1:
+            _, count_type, index_type, _ = properties[0]
+            count_type = np.dtype(byte_order + PLY_TYPES[count_type])
+            index_type = np.dtype(byte_order + PLY_TYPES[index_type])
+            values, offset = _read_ply_lists(
+                buffer, count, offset, count_type, index_type
+            )
+        else:
+            raise ValueError(f"Unsupported PLY element {name} in {file_name}")
+        if name == "vertex":
+            vertices = values
+        elif name == "face":
+            faces = values
+    return vertices, faces
+
+
+def write_ply(file_name, vertices, faces):
+    # binary triangle mesh with float vertices
+    vertices = np.asarray(vertices, dtype="<f4")
+    faces = np.asarray(faces)
+    records = np.empty(len(faces), dtype=[("count", "u1"), ("indices", "<u4", (3,))])
+    records["count"] = 3
+    records["indices"] = faces
+    with open(file_name, "wb") as f:
+        f.write(
+            "".join(
+                [
+                    "ply\n",
+                    "format binary_little_endian 1.0\n",
+                    f"element vertex {len(vertices)}\n",
+                    "property float x\n",
+                    "property float y\n",
+                    "property float z\n",
+                    f"element face {len(faces)}\n",
+                    "property list uchar uint vertex_indices\n",
+                    "end_header\n",
+                ]
+            ).encode("ascii")
+        )
+        f.write(np.ascontiguousarray(vertices).tobytes())
+        f.write(records.tobytes())
+
+
+def _read_ply_lists(buffer, count, offset, count_type, index_type):
+    # all lists are read at once if they have the length of the first one,
+    # e.g. triangle meshes, otherwise one by one
+    if count == 0:
+        return np.empty((0, 0), dtype=index_type), offset
+    k = int(np.frombuffer(buffer, count_type, count=1, offset=offset)[0])
+    dtype = np.dtype([("count", count_type), ("indices", index_type, (k,))])
+    if offset + count * dtype.itemsize <= len(buffer):
+        lists = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+        if np.all(lists["count"] == k):
+            return lists["indices"], offset + lists.nbytes
+    lists = []
+    for _ in range(count):
+        k = int(np.frombuffer(buffer, count_type, count=1, offset=offset)[0])
+        offset += count_type.itemsize
+        lists.append(np.frombuffer(buffer, index_type, count=k, offset=offset))
+        offset += k * index_type.itemsize
+    return lists, offset
 
 
 class AbstractScenario:
@@ -7,6 +275,57 @@ class AbstractScenario:
     hole_position = []
     hole_axis = []
 
+    def __init__(
+        self, target_fraction=None, max_targets=None, subsampling="voxel", seed=0
+    ):
+        # Runs a subset of the target cloud with at most the given fraction
+        # or number of targets. Subsampled scenarios are named differently,
+        # so that their results are not mixed with those of the full cloud.
+        self.target_fraction = target_fraction
+        self.max_targets = max_targets
+        self.subsampling = subsampling
+        self.seed = seed
+        if target_fraction is not None or max_targets is not None:
+            size = max_targets if target_fraction is None else f"{target_fraction:g}"
+            if target_fraction is not None and max_targets is not None:
+                size = f"{target_fraction:g}-{max_targets}"
+            self.name = f"{self.name}@{subsampling}{size}"
+
+    def get_target_file(self):
+        # the target cloud, or its subsampled copy that is cached by the hash
+        # of the cloud and the subsampling parameters
+        if self.target_fraction is None and self.max_targets is None:
+            return self.pcd_file
+        source = resolve_uri(self.pcd_file)
+        key = hashlib.sha256(
+            json.dumps(
+                [
+                    file_hash(source),
+                    self.target_fraction,
+                    self.max_targets,
+                    self.subsampling,
+                    self.seed,
+                ]
+            ).encode()
+        ).hexdigest()
+        cache_file = os.path.join(SUBSAMPLE_CACHE_DIR, f"{key}.pcd")
+        if not os.path.exists(cache_file):
+            fields, points = read_pcd(source)
+            count = len(points)
+            if self.target_fraction is not None:
+                count = round(count * self.target_fraction)
+            if self.max_targets is not None:
+                count = min(count, self.max_targets)
+            indices = subsample(
+                points[:, :3], max(count, 1), self.subsampling, self.seed
+            )
+            os.makedirs(SUBSAMPLE_CACHE_DIR, exist_ok=True)
+            fd, tmp_file = tempfile.mkstemp(dir=SUBSAMPLE_CACHE_DIR, suffix=".tmp")
+            os.close(fd)
+            write_pcd(tmp_file, fields, points[indices], "binary")
+            os.replace(tmp_file, cache_file)
+        return cache_file
+
     def get_config(self, planning_group):
         reach_config = {
             "optimization": {
@@ -35,7 +354,7 @@ class AbstractScenario:
             },
             "target_pose_generator": {
                 "name": "PointCloudTargetPoseGenerator",
-                "pcd_file": self.pcd_file,
+                "pcd_file": self.get_target_file(),
             },
             "logger": {"name": "BoostProgressConsoleLogger"},
         }
@@ -44,6 +363,21 @@ class AbstractScenario:
             del reach_config["display"]["collision_mesh_filename"]
         return reach_config
 
+    def get_targets(self):
+        return read_pcd(resolve_uri(self.get_target_file()))
+
+    def get_mesh(self):
+        if self.ply_file is None:
+            return None, None
+        return read_ply(resolve_uri(self.ply_file))
+
+    def get_file_hash(self):
+        h = hashlib.sha256()
+        for uri in (self.ply_file, self.get_target_file()):
+            if uri is not None:
+                h.update(file_hash(resolve_uri(uri)).encode())
+        return h.hexdigest()
+
     @property
     def ply_file(self):
         return f"package://ebike/scenarios/{self.file_name}.ply"
@@ -0,0 +1,79 @@
+# SPDX-License-Identifier: MIT
+import heapq
+from datetime import datetime, timedelta
+
+from ebike.database import connect, ensure_db_exists
+from ebike.ik import IK_TIMEOUT
+
+# process start, robot model and collision mesh loading for every REACH study
+STUDY_OVERHEAD = 2.0
+
+
+def get_target_costs(cells):
+    # Mean cost per target of the earlier experiments of the (robot, scenario,
+    # solver) cells from their summaries; failed targets run into the solver
+    # timeout, so they are counted as such.
+    ensure_db_exists()
+    cells = list(cells)
+    if not cells:
+        return {}, {}
+    with connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT e.robot, e.scenario, e.solver, e.config_hash, SUM(s.num_results), SUM(s.reached * COALESCE(s.time_mean, 0) + (s.num_results - s.reached) * ?) FROM experiments e JOIN summaries s ON s.experiment_id = e.id WHERE e.complete = 1 AND s.num_results > 0 AND (e.robot, e.scenario, e.solver) IN (VALUES {}) GROUP BY e.robot, e.scenario, e.solver, e.config_hash".format(
+                ", ".join(["(?, ?, ?)"] * len(cells))
+            ),
+            [IK_TIMEOUT] + [name for cell in cells for name in cell],
+        )
+        rows = cur.fetchall()
+    by_hash = {}
+    by_name = {}
+    for robot, scenario, solver, config_hash, count, total in rows:
+        if config_hash is not None:
+            by_hash[config_hash] = total / count
+        previous_count, previous_total = by_name.get((robot, scenario, solver), (0, 0))
+        by_name[(robot, scenario, solver)] = (
+            previous_count + count,
+            previous_total + total,
+        )
+    by_name = {key: total / count for key, (count, total) in by_name.items()}
+    return by_hash, by_name
+
+
+def estimate_costs(runs):
+    # runs without any history are assumed to fail on every target
+    by_hash, by_name = get_target_costs(
+        {(run.robot.name, run.scenario.name, run.ik.name) for run in runs}
+    )
+    for run in runs:
+        key = (run.robot.name, run.scenario.name, run.ik.name)
+        run.target_cost = by_hash.get(run.config_hash, by_name.get(key, IK_TIMEOUT))
+        run.costs = [
+            STUDY_OVERHEAD + run.target_cost * len(indices)
+            for indices, _ in run.subsets
+        ]
+
+
+def longest_first(runs):
+    return sorted(runs, key=lambda run: sum(run.costs), reverse=True)
+
+
+def estimate_makespan(costs, workers):
+    # greedy longest-processing-time assignment, which is what a pool that is
+    # fed longest jobs first does
+    loads = [0.0] * workers
+    for cost in sorted(costs, reverse=True):
+        heapq.heappush(loads, heapq.heappop(loads) + cost)
+    return max(loads)
+
+
+def print_schedule(runs, workers):
+    for run in runs:
+        print(
+            f"{run.name}: {len(run.subsets)} studies, estimated {timedelta(seconds=round(sum(run.costs)))}"
+        )
+    makespan = estimate_makespan([cost for run in runs for cost in run.costs], workers)
+    eta = datetime.now() + timedelta(seconds=makespan)
+    print(
+        f"Estimated runtime {timedelta(seconds=round(makespan))} on {workers} workers, ETA {eta:%Y-%m-%d %H:%M}"
+    )
@@ -0,0 +1,165 @@
+# SPDX-License-Identifier: MIT
+from statistics import NormalDist
+
+import numpy as np
+
+
+def z_score(confidence):
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def wilson_interval(successes, n, confidence=0.95):
+    z = z_score(confidence)
+    p = np.asarray(successes) / n
+    denominator = 1 + z**2 / n
+    center = (p + z**2 / (2 * n)) / denominator
+    half_width = z * np.sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / denominator
+    return center - half_width, center + half_width
+
+
+def median_interval(samples, confidence=0.95):
+    # distribution-free interval from the order statistics around the median
+    samples = np.sort(samples)
+    n = len(samples)
+    z = z_score(confidence)
+    lower = int(np.floor(n / 2 - z * np.sqrt(n) / 2))
+    upper = int(np.ceil(n / 2 + z * np.sqrt(n) / 2))
+    return samples[max(lower, 0)], samples[min(upper, n - 1)]
+
+
+def _clustered_ecdf(values, clusters, weights, thresholds):
+    # Ratio sum_t a_t / sum_t w_t of the number a_t of values <= every threshold
+    # of cluster t to its weight w_t, and the linearized variance of the ratio
+    # with the clusters as the sampling units.
+    finite = np.isfinite(values)
+    values = values[finite]
+    clusters = clusters[finite]
+    order = np.argsort(values, kind="stable")
+    index = np.searchsorted(values[order], thresholds, side="right")
+    # rank of every value within its cluster, the k-th value of a cluster
+    # raises its a_t**2 by 2k + 1
+    sorted_clusters = clusters[order]
+    by_cluster = np.argsort(sorted_clusters, kind="stable")
+    counts = np.bincount(sorted_clusters, minlength=len(weights))
+    rank = np.empty(len(values))
+    rank[by_cluster] = np.arange(len(values)) - np.repeat(
+        np.cumsum(counts) - counts, counts
+    )
+    a = index.astype(float)
+    aa = np.concatenate([[0], np.cumsum(2 * rank + 1)])[index]
+    aw = np.concatenate([[0], np.cumsum(weights[sorted_clusters])])[index]
+    total = np.sum(weights)
+    t = np.count_nonzero(weights)
+    p = a / total
+    if t < 2:
+        # a single target says nothing about the variation between targets
+        return p, np.full(np.shape(p), np.inf), t
+    variance = t / (t - 1) * (aa - 2 * p * aw + p**2 * np.sum(weights**2)) / total**2
+    return p, np.maximum(variance, 0), t
+
+
+def ecdf_intervals(values, targets, thresholds, confidence=0.95):
+    # Fraction of all results with a value <= every threshold, for solve rates
+    # at durations or iteration counts, with np.inf for the targets that were
+    # not reached. Repetitions of a target are not independent, so the Wilson
+    # interval uses the effective number of results given the variance
+    # between the targets.
+    values = np.asarray(values, dtype=float)
+    targets = np.asarray(targets)
+    n = len(values)
+    _, clusters = np.unique(targets, return_inverse=True)
+    weights = np.bincount(clusters).astype(float)
+    rate, variance, t = _clustered_ecdf(values, clusters, weights, thresholds)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        effective = np.where(variance > 0, rate * (1 - rate) / variance, n)
+    # without any variation, e.g. all targets reached, the targets count once
+    effective = np.where((rate == 0) | (rate == 1), t, effective)
+    effective = np.clip(effective, 1, n)
+    low, high = wilson_interval(rate * effective, effective, confidence)
+    return rate, low, high
+
+
+def quantile_interval(values, targets, quantile, confidence=0.95):
+    # Quantile of the finite values, e.g. the median solve time of the reached
+    # targets, with Woodruff's interval: the quantiles at the limits of the
+    # confidence interval of the ECDF at the estimate, with the targets as the
+    # sampling units.
+    values = np.asarray(values, dtype=float)
+    targets = np.asarray(targets)
+    finite = np.isfinite(values)
+    if not np.any(finite):
+        return np.nan, np.nan, np.nan
+    reached = values[finite]
+    estimate = np.quantile(reached, quantile, method="inverted_cdf")
+    _, clusters = np.unique(targets[finite], return_inverse=True)
+    weights = np.bincount(clusters).astype(float)
+    _, variance, _ = _clustered_ecdf(reached, clusters, weights, estimate)
+    half_width = z_score(confidence) * np.sqrt(variance)
+    low, high = np.quantile(
+        reached,
+        np.clip([quantile - half_width, quantile + half_width], 0, 1),
+        method="inverted_cdf",
+    )
+    return estimate, low, high
+
+
+def _merge_moments(count, mean, m2, values):
+    # Chan et al. update of running mean and squared deviations with a batch
+    n = len(values)
+    if n == 0:
+        return count, mean, m2
+    batch_mean = float(np.mean(values))
+    batch_m2 = float(np.sum((values - batch_mean) ** 2))
+    total = count + n
+    delta = batch_mean - mean
+    mean += delta * n / total
+    m2 += batch_m2 + delta**2 * count * n / total
+    return total, mean, m2
+
+
+class ResultSummary:
+    def __init__(self, experiment_id=None):
+        self.experiment_id = experiment_id
+        self.count = 0
+        self.reached = 0
+        self.time_mean = 0.0
+        self.time_m2 = 0.0
+        self.time_max = 0.0
+        self.iterations_mean = 0.0
+        self.iterations_m2 = 0.0
+
+    def update(self, results):
+        self.count += len(results)
+        reached = results[results["reached"]]
+        if len(reached) == 0:
+            return
+        self.time_max = max(self.time_max, float(np.max(reached["ik_time"])))
+        _, self.time_mean, self.time_m2 = _merge_moments(
+            self.reached, self.time_mean, self.time_m2, reached["ik_time"]
+        )
+        self.reached, self.iterations_mean, self.iterations_m2 = _merge_moments(
+            self.reached,
+            self.iterations_mean,
+            self.iterations_m2,
+            reached["solution_callback_count"],
+        )
+
+    @property
+    def success_rate(self):
+        return self.reached / self.count if self.count else float("nan")
+
+    @property
+    def time_std(self):
+        return np.sqrt(self.time_m2 / self.reached) if self.reached else float("nan")
+
+    @property
+    def iterations_std(self):
+        if not self.reached:
+            return float("nan")
+        return np.sqrt(self.iterations_m2 / self.reached)
+
+    @classmethod
+    def from_results(cls, results, experiment_id=None):
+        summary = cls(experiment_id)
+        summary.update(results)
+        return summary
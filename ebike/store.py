@@ -0,0 +1,86 @@
+# SPDX-License-Identifier: MIT
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from ebike import database
+from ebike.utils import RESULT_DTYPE
+
+# One directory per complete experiment with a .npy file per result field, next
+# to results.db which stays the catalog of experiments.
+STORE_DIR = "results_store"
+
+_store_dirs = {}
+
+
+def _store_dir():
+    path = os.path.abspath(database.DB_FILE)
+    if path not in _store_dirs:
+        _store_dirs[path] = os.path.join(STORE_DIR, database.get_store_id())
+    return _store_dirs[path]
+
+
+def _experiment_dir(experiment_id):
+    return os.path.join(_store_dir(), str(experiment_id))
+
+
+def has_results(experiment_id):
+    return os.path.isdir(_experiment_dir(experiment_id))
+
+
+def write_results(experiment_id, results, goal_states=None):
+    # written to a temporary directory first so that readers never see a
+    # partially written experiment
+    os.makedirs(_store_dir(), exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=_store_dir())
+    try:
+        for field in RESULT_DTYPE.names:
+            np.save(
+                os.path.join(tmp_dir, f"{field}.npy"),
+                np.ascontiguousarray(results[field]),
+            )
+        if goal_states is not None:
+            np.save(os.path.join(tmp_dir, "goal_state.npy"), goal_states)
+        os.rename(tmp_dir, _experiment_dir(experiment_id))
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not has_results(experiment_id):
+            raise
+
+
+def load_columns(experiment_id, fields=RESULT_DTYPE.names):
+    # memory-mapped, so nothing is read until the arrays are used; fields that
+    # are not in the store are read from the database
+    columns = []
+    results = None
+    for field in fields:
+        file_name = os.path.join(_experiment_dir(experiment_id), f"{field}.npy")
+        if os.path.exists(file_name):
+            columns.append(np.load(file_name, mmap_mode="r"))
+        elif field == "goal_state":
+            columns.append(database.load_goal_states(experiment_id))
+        else:
+            if results is None:
+                results = database.load_results(experiment_id)
+            columns.append(results[field])
+    return tuple(columns)
+
+
+def export_experiments():
+    database.ensure_db_exists()
+    with database.connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM experiments WHERE complete = 1")
+        experiment_ids = [experiment_id for (experiment_id,) in cur.fetchall()]
+    exported = 0
+    for experiment_id in experiment_ids:
+        if not has_results(experiment_id):
+            write_results(
+                experiment_id,
+                database.load_results(experiment_id),
+                database.load_goal_states(experiment_id),
+            )
+            exported += 1
+    return exported
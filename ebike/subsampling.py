@@ -0,0 +1,88 @@
+# SPDX-License-Identifier: MIT
+import numpy as np
+
+
+def _voxel_cells(xyz, size):
+    # index of the voxel of every point on a grid of the given voxel size
+    cells = np.floor((xyz - xyz.min(axis=0)) / size).astype(np.int64)
+    dims = cells.max(axis=0) + 1
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    return np.unique(keys, return_inverse=True)[1]
+
+
+def voxel_cells(xyz, count):
+    # Voxel index of every point on the finest grid with at most count
+    # occupied voxels, found by bisection of the voxel size.
+    extent = float(np.max(np.ptp(xyz, axis=0))) or 1.0
+    lo, hi = extent * 1e-6, extent * 1.001
+    cells = _voxel_cells(xyz, hi)
+    for _ in range(24):
+        size = np.sqrt(lo * hi)
+        candidate = _voxel_cells(xyz, size)
+        if candidate.max() + 1 <= count:
+            hi, cells = size, candidate
+        else:
+            lo = size
+    return cells
+
+
+def voxel_grid(xyz, count, rng=None):
+    # the point closest to the centroid of every occupied voxel
+    cells = voxel_cells(xyz, count)
+    n = cells.max() + 1
+    centroids = (
+        np.stack([np.bincount(cells, xyz[:, i], n) for i in range(3)], 1)
+        / np.bincount(cells, minlength=n)[:, None]
+    )
+    distances = np.sum((xyz - centroids[cells]) ** 2, axis=1)
+    order = np.lexsort((distances, cells))
+    first = np.concatenate([[True], cells[order][1:] != cells[order][:-1]])
+    return np.sort(order[first])
+
+
+def stratified_random(xyz, count, rng):
+    # random points from the voxels of a grid with at most half as many
+    # occupied voxels as points: one from every voxel and the rest in
+    # proportion to the number of points in the voxels
+    cells = voxel_cells(xyz, max(count // 2, 1))
+    population = np.bincount(cells)
+    quota = 1 + (population - 1) * (count - len(population)) / (
+        len(xyz) - len(population)
+    )
+    allocation = np.floor(quota).astype(np.int64)
+    remainder = count - allocation.sum()
+    allocation[np.argsort(allocation - quota)[:remainder]] += 1
+    order = np.lexsort((rng.random(len(xyz)), cells))
+    starts = np.concatenate([[0], np.cumsum(population)[:-1]])
+    rank = np.arange(len(xyz)) - starts[cells[order]]
+    return np.sort(order[rank < allocation[cells[order]]])
+
+
+def farthest_point(xyz, count, rng):
+    # greedy farthest point sampling from a random start
+    chosen = np.empty(count, dtype=np.int64)
+    chosen[0] = rng.integers(len(xyz))
+    distances = np.full(len(xyz), np.inf)
+    for i in range(count):
+        if i:
+            chosen[i] = np.argmax(distances)
+        offset = xyz - xyz[chosen[i]]
+        np.minimum(distances, np.einsum("ij,ij->i", offset, offset), out=distances)
+    return np.sort(chosen)
+
+
+METHODS = {
+    "voxel": voxel_grid,
+    "farthest": farthest_point,
+    "stratified": stratified_random,
+}
+
+
+def subsample(xyz, count, method="voxel", seed=0):
+    # indices of at most count points that cover the cloud evenly
+    xyz = np.asarray(xyz, dtype=np.float64)
+    if count >= len(xyz):
+        return np.arange(len(xyz))
+    if method not in METHODS:
+        raise ValueError(f"Unknown subsampling method {method}")
+    return METHODS[method](xyz, count, np.random.default_rng(seed))
@@ -0,0 +1,181 @@
+# SPDX-License-Identifier: MIT
+import os
+
+import numpy as np
+
+from ebike.database import DB_FILE, ensure_db_exists, shared_connection
+from ebike.store import has_results, load_columns
+from ebike.utils import RESULT_DTYPE
+
+SUMMARY_COLUMNS = (
+    "num_results",
+    "reached",
+    "time_max",
+    "iterations_max",
+    "time_mean",
+    "time_mean_all",
+    "iterations_mean",
+    "time_p50",
+    "time_p90",
+    "time_p99",
+    "iteration_values",
+    "iteration_counts",
+    "sorted_times",
+)
+# summaries of complete experiments never change, so they are kept for the rest of
+# the process, keyed by database file and experiment id
+_cache = {}
+# the same for the per-target results the confidence intervals need
+_results_cache = {}
+
+BLOB_TYPES = {
+    "iteration_values": np.int64,
+    "iteration_counts": np.int64,
+    "sorted_times": np.float64,
+}
+
+
+class ExperimentSummary:
+    # Everything the reporting functions need from the results of one
+    # experiment. The iterations of the reached targets are stored as a sparse
+    # histogram of the occupied values and their counts, their solve times
+    # sorted for exact ECDFs.
+    def __init__(self, **columns):
+        for column in SUMMARY_COLUMNS:
+            setattr(self, column, columns[column])
+
+    @classmethod
+    def from_results(cls, reached, ik_time, count):
+        reached = np.asarray(reached, dtype=bool)
+        ik_time = np.asarray(ik_time)
+        count = np.asarray(count)
+        times = ik_time[reached]
+        iterations = count[reached]
+        iteration_values, iteration_counts = np.unique(
+            iterations.astype(np.int64), return_counts=True
+        )
+        if len(times):
+            p50, p90, p99 = np.quantile(times, [0.5, 0.9, 0.99])
+        else:
+            p50 = p90 = p99 = None
+        return cls(
+            num_results=len(reached),
+            reached=int(np.sum(reached)),
+            time_max=float(np.max(ik_time)) if len(ik_time) else None,
+            iterations_max=int(np.max(count)) if len(count) else None,
+            time_mean=float(np.mean(times)) if len(times) else None,
+            time_mean_all=float(np.mean(ik_time)) if len(ik_time) else None,
+            iterations_mean=float(np.mean(iterations)) if len(times) else None,
+            time_p50=p50,
+            time_p90=p90,
+            time_p99=p99,
+            iteration_values=iteration_values,
+            iteration_counts=iteration_counts,
+            sorted_times=np.sort(times),
+        )
+
+    def solved_within(self, duration):
+        return int(np.searchsorted(self.sorted_times, duration, side="right"))
+
+    def reached_iterations(self):
+        return np.repeat(self.iteration_values, self.iteration_counts)
+
+
+def insert_summary(cur, experiment_id, summary):
+    values = [
+        (
+            np.asarray(getattr(summary, column), dtype=BLOB_TYPES[column]).tobytes()
+            if column in BLOB_TYPES
+            else getattr(summary, column)
+        )
+        for column in SUMMARY_COLUMNS
+    ]
+    cur.execute(
+        "INSERT OR REPLACE INTO summaries (experiment_id, {}) VALUES (?, {})".format(
+            ", ".join(SUMMARY_COLUMNS), ", ".join("?" * len(SUMMARY_COLUMNS))
+        ),
+        (experiment_id, *values),
+    )
+
+
+def load_summaries(experiment_ids):
+    # summaries of experiments saved before they existed are computed from the
+    # raw results once and stored
+    path = os.path.abspath(DB_FILE)
+    experiment_ids = list(experiment_ids)
+    missing = [e for e in experiment_ids if (path, e) not in _cache]
+    if missing:
+        ensure_db_exists()
+        conn = shared_connection()
+        with conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT experiment_id, {} FROM summaries WHERE experiment_id IN ({})".format(
+                    ", ".join(SUMMARY_COLUMNS), ",".join("?" * len(missing))
+                ),
+                missing,
+            )
+            for experiment_id, *values in cur.fetchall():
+                columns = dict(zip(SUMMARY_COLUMNS, values))
+                for column, dtype in BLOB_TYPES.items():
+                    columns[column] = np.frombuffer(columns[column], dtype=dtype)
+                _cache[(path, experiment_id)] = ExperimentSummary(**columns)
+            for experiment_id in missing:
+                if (path, experiment_id) not in _cache:
+                    summary = ExperimentSummary.from_results(
+                        *load_columns(
+                            experiment_id,
+                            ("reached", "ik_time", "solution_callback_count"),
+                        )
+                    )
+                    insert_summary(cur, experiment_id, summary)
+                    _cache[(path, experiment_id)] = summary
+    return {e: _cache[(path, e)] for e in experiment_ids}
+
+
+def load_target_results(experiment_ids):
+    # Target indices, solve times and iterations of every experiment, np.inf
+    # for the targets that were not reached. Experiments in the result store
+    # are memory-mapped, all others are read in one query.
+    path = os.path.abspath(DB_FILE)
+    experiment_ids = list(experiment_ids)
+    missing = [e for e in experiment_ids if (path, e) not in _results_cache]
+    columns = {}
+    for experiment_id in missing:
+        if has_results(experiment_id):
+            columns[experiment_id] = load_columns(
+                experiment_id,
+                ("target", "reached", "ik_time", "solution_callback_count"),
+            )
+    unexported = [e for e in missing if e not in columns]
+    if unexported:
+        ensure_db_exists()
+        cur = shared_connection().cursor()
+        cur.execute(
+            "SELECT experiment_id, target, reached, ik_time, solution_callback_count FROM results WHERE experiment_id IN ({}) ORDER BY experiment_id, target".format(
+                ",".join("?" * len(unexported))
+            ),
+            unexported,
+        )
+        rows = np.array(
+            cur.fetchall(),
+            dtype=[("experiment_id", np.int64)] + RESULT_DTYPE.descr,
+        )
+        for experiment_id in unexported:
+            selected = rows[rows["experiment_id"] == experiment_id]
+            columns[experiment_id] = tuple(
+                selected[name] for name in RESULT_DTYPE.names
+            )
+    for experiment_id, (target, reached, ik_time, count) in columns.items():
+        _results_cache[(path, experiment_id)] = (
+            np.asarray(target),
+            np.where(reached, ik_time, np.inf),
+            np.where(reached, count, np.inf),
+        )
+    return {e: _results_cache[(path, e)] for e in experiment_ids}
+
+
+def pool_results(experiment_ids):
+    # the target results of several repetitions taken together
+    results = load_target_results(experiment_ids).values()
+    return tuple(np.concatenate([r[i] for r in results]) for i in range(3))
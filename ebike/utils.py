@@ -1,53 +1,168 @@
 # SPDX-License-Identifier: MIT
-import os.path
-import sqlite3
+import hashlib
+import json
+import os
 import subprocess
+import tempfile
 
+import numpy as np
 import pandas as pd
+from numpy.lib.recfunctions import unstructured_to_structured
 
+XACRO_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "ebike", "xacro"
+)
+XACRO_CACHE_SIZE = 64 * 1024 * 1024
 
-def get_xacro(xacro_file, xacro_args=None):
-    if xacro_args is None:
-        cmd_args = []
-    else:
-        cmd_args = [f"{k}:={v}" for k, v in xacro_args.items()]
-    return subprocess.check_output(
-        ["xacro", xacro_file] + cmd_args, universal_newlines=True
+_xacro_cache = {}
+
+RESULT_DTYPE = np.dtype(
+    [
+        ("target", np.int32),
+        ("reached", np.bool_),
+        ("ik_time", np.float64),
+        ("solution_callback_count", np.int32),
+    ]
+)
+
+
+def _expand_xacro(xacro_file, mappings):
+    # expands the file in-process, which records the included files on the way
+    # instead of a second full expansion with xacro --deps
+    import xacro
+
+    del xacro.all_includes[:]
+    doc = xacro.process_file(xacro_file, mappings=mappings)
+    return doc.toprettyxml(indent="  "), list(xacro.all_includes)
+
+
+def _run_xacro(xacro_file, mappings):
+    output, deps = _expand_xacro(xacro_file, mappings)
+    dependencies = []
+    for file_name in dict.fromkeys(os.path.abspath(f) for f in [xacro_file] + deps):
+        stat = os.stat(file_name)
+        dependencies.append(
+            [file_name, stat.st_mtime_ns, stat.st_size, file_hash(file_name)]
+        )
+    return dependencies, output
+
+
+def _dependencies_valid(dependencies):
+    for file_name, mtime, size, digest in dependencies:
+        try:
+            stat = os.stat(file_name)
+        except OSError:
+            return False
+        if (stat.st_mtime_ns, stat.st_size) == (mtime, size):
+            continue
+        if stat.st_size != size or file_hash(file_name) != digest:
+            return False
+    return True
+
+
+def _evict_xacro_cache():
+    entries = []
+    for entry in os.scandir(XACRO_CACHE_DIR):
+        if entry.name.endswith(".json"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= XACRO_CACHE_SIZE:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total_size -= size
+
+
+def get_xacro(xacro_file, xacro_args=None, use_cache=True):
+    mappings = {k: str(v) for k, v in (xacro_args or {}).items()}
+    cmd_args = [f"{k}:={v}" for k, v in mappings.items()]
+    if not use_cache:
+        return subprocess.check_output(
+            ["xacro", xacro_file] + cmd_args, universal_newlines=True
+        )
+
+    memory_key = (os.path.abspath(xacro_file), tuple(sorted(cmd_args)))
+    if memory_key in _xacro_cache:
+        dependencies, output = _xacro_cache[memory_key]
+        if _dependencies_valid(dependencies):
+            return output
+
+    # entries are addressed by the content of the main file and the arguments,
+    # included files are checked against the mtimes and hashes stored in the entry
+    key = hashlib.sha256(
+        json.dumps([memory_key[0], file_hash(xacro_file), memory_key[1]]).encode()
+    ).hexdigest()
+    cache_file = os.path.join(XACRO_CACHE_DIR, f"{key}.json")
+    try:
+        with open(cache_file, "r") as f:
+            entry = json.load(f)
+        if _dependencies_valid(entry["dependencies"]):
+            os.utime(cache_file)
+            _xacro_cache[memory_key] = (entry["dependencies"], entry["output"])
+            return entry["output"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    dependencies, output = _run_xacro(xacro_file, mappings)
+    _xacro_cache[memory_key] = (dependencies, output)
+    try:
+        os.makedirs(XACRO_CACHE_DIR, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=XACRO_CACHE_DIR, suffix=".tmp", delete=False
+        ) as f:
+            json.dump({"dependencies": dependencies, "output": output}, f)
+        os.replace(f.name, cache_file)
+        _evict_xacro_cache()
+    except OSError as e:
+        print(f"Could not write xacro cache: {e}")
+    return output
+
+
+def file_hash(file_name):
+    h = hashlib.sha256()
+    with open(file_name, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def records_to_array(records, targets=None):
+    # one pass over the REACH records straight into the structured array
+    results = np.fromiter(
+        ((0, d.reached, d.ik_time, d.solution_callback_count) for d in records),
+        dtype=RESULT_DTYPE,
+        count=len(records),
     )
+    results["target"] = np.arange(len(results)) if targets is None else targets
+    return results
+
+
+def records_to_goal_states(records):
+    # reached joint solutions with one float64 field per joint, NaN where the
+    # target was not reached
+    joint_names = next(
+        (list(d.goal_state) for d in records if d.reached and d.goal_state), None
+    )
+    if joint_names is None:
+        return None
+    values = np.full((len(records), len(joint_names)), np.nan)
+    for i, d in enumerate(records):
+        if d.reached:
+            values[i] = [d.goal_state[name] for name in joint_names]
+    return unstructured_to_structured(
+        values, np.dtype([(name, np.float64) for name in joint_names])
+    )
+
+
+def as_result_array(result):
+    if isinstance(result, np.ndarray):
+        return result
+    return records_to_array(list(result))
 
 
 def result_to_df(result):
-    df = pd.DataFrame()
-    df["reached"] = [d.reached for d in result]
-    df["ik_time"] = [d.ik_time for d in result]
-    df["solution_callback_count"] = [d.solution_callback_count for d in result]
-    return df
-
-
-def ensure_db_exists():
-    if not os.path.exists("results.db"):
-        with sqlite3.connect("results.db") as conn:
-            cur = conn.cursor()
-            sql = "CREATE TABLE experiments (id integer primary key, robot varchar(255), scenario varchar(255), solver varchar(255), time text)"
-            cur.execute(sql)
-            sql = "CREATE TABLE results (id integer primary key, experiment_id integer references experiments(id), reached integer, ik_time REAL, solution_callback_count integer)"
-            cur.execute(sql)
-            conn.commit()
-
-
-def save_result(robot, scenario, solver, start_time, result):
-    ensure_db_exists()
-    with sqlite3.connect("results.db") as conn:
-        cur = conn.cursor()
-        sql = "INSERT INTO experiments (robot, scenario, solver, time) VALUES (?, ?, ?, ?)"
-        cur.execute(
-            sql, (robot, scenario, solver, start_time.isoformat(" ", "milliseconds"))
-        )
-        conn.commit()
-        experiment_id = cur.lastrowid
-        for d in result[0]:
-            sql = "INSERT INTO results (experiment_id, reached, ik_time, solution_callback_count) VALUES (?, ?, ?, ?)"
-            cur.execute(
-                sql, (experiment_id, d.reached, d.ik_time, d.solution_callback_count)
-            )
-        conn.commit()
+    return pd.DataFrame(as_result_array(result), copy=False)
@@ -1,12 +1,16 @@
 # SPDX-License-Identifier: MIT
 import os.path
-import sqlite3
 from itertools import zip_longest
 
 import matplotlib.pyplot as plt
 import numpy as np
 
-from ebike.utils import result_to_df
+from ebike.dataset import get_dataset
+from ebike.ecdf import decimate, ecdf, envelope, evaluation_grid, steps
+from ebike.manifest import fingerprint, is_up_to_date, write_manifest
+from ebike.stats import ResultSummary, ecdf_intervals, quantile_interval
+from ebike.summary import pool_results
+from ebike.utils import as_result_array
 
 
 def get(li, i, default=None):
@@ -29,6 +33,8 @@ COLORS = [
     "#92dadd",
 ]
 SOLVER_COLORS = ["#5790fc", "#f89c20", "#e42536", "#964a8b", "#9c9ca1", "#7a21dd"]
+# horizontal error of the downsampled curves in pixels of the saved figures
+DOWNSAMPLE_TOLERANCE = 0.5
 
 
 def get_solver_colors(solvers):
@@ -52,79 +58,116 @@ def get_solver_colors(solvers):
     return return_colors
 
 
+def hide_duplicate_labels(curves):
+    # only the first curve with a label gets a legend entry
+    entries = set()
+    for _, _, _, kwargs in curves:
+        if kwargs["label"] in entries:
+            kwargs["label"] = "_" + kwargs["label"]
+        entries.add(kwargs["label"])
+
+
+def save_views(fig, ax, curves, views, tolerance=DOWNSAMPLE_TOLERANCE, dpi=300):
+    # Saves the step curves once per (x limit, file name) view. The curves are
+    # (x, y, band, plot kwargs) with an optional (min, max) band and are drawn
+    # again for every view with only the points that can be told apart.
+    columns = ax.get_position().width * fig.get_figwidth() * dpi / tolerance
+    for upper, file_name in views:
+        artists = []
+        for x, y, band, kwargs in curves:
+            keep = decimate(x, upper, columns)
+            artists += ax.plot(x[keep], y[keep], drawstyle="steps-post", **kwargs)
+            if band is not None:
+                artists.append(
+                    ax.fill_between(
+                        x[keep],
+                        band[0][keep],
+                        band[1][keep],
+                        alpha=0.2,
+                        color=kwargs["color"],
+                        step="post",
+                    )
+                )
+        legend = ax.legend()
+        ax.set_xlim(0, upper)
+        fig.savefig(file_name, dpi=dpi, bbox_inches="tight")
+        legend.remove()
+        for artist in artists:
+            artist.remove()
+    return [file_name for _, file_name in views]
+
+
 def print_results(results):
     for robot, robot_data in results.items():
         for scenario, scenario_data in robot_data.items():
-            results_df = {}
+            summaries = {}
             for solver, data in scenario_data.items():
-                results_df[solver] = result_to_df(data[0])
+                if not isinstance(data, ResultSummary):
+                    data = ResultSummary.from_results(as_result_array(data))
+                summaries[solver] = data
 
             print(f"Success rates ({robot} on {scenario}):")
-            for solver, data in results_df.items():
-                success_rate = np.sum(data.reached == 1) / len(data)
-                print(f"{solver}: {success_rate}")
+            for solver, summary in summaries.items():
+                print(f"{solver}: {summary.success_rate}")
 
             print(f"Solve times (ms) ({robot} on {scenario}):")
-            for solver, data in results_df.items():
-                solve_times = data.ik_time[data.reached == 1] * 1000
+            for solver, summary in summaries.items():
                 print(
-                    f"{solver}: {solve_times.mean():.2f} ms ± {solve_times.std():.2f} ms"
+                    f"{solver}: {summary.time_mean * 1000:.2f} ms ± {summary.time_std * 1000:.2f} ms"
                 )
 
             print(f"Solution callback count ({robot} on {scenario}):")
-            for solver, data in results_df.items():
-                counts = data.solution_callback_count[data.reached == 1]
-                print(f"{solver}: {counts.mean():.2f} ± {counts.std():.2f}")
+            for solver, summary in summaries.items():
+                print(
+                    f"{solver}: {summary.iterations_mean:.2f} ± {summary.iterations_std:.2f}"
+                )
 
 
 def plot_results(results):
     for robot, robot_data in results.items():
         for scenario, scenario_data in robot_data.items():
-            results_df = {}
-            for solver, data in scenario_data.items():
-                results_df[solver] = result_to_df(data[0])
+            arrays = {
+                solver: as_result_array(data) for solver, data in scenario_data.items()
+            }
 
             plt.title(f"Success rates ({robot} on {scenario})")
             plt.bar(
-                results_df.keys(),
-                [np.sum(data.reached == 1) / len(data) for data in results_df.values()],
+                arrays.keys(),
+                [np.mean(data["reached"]) for data in arrays.values()],
             )
             plt.show()
             plt.title(f"Solve times (ms) ({robot} on {scenario})")
             plt.boxplot(
-                [
-                    data.ik_time[data.reached == 1] * 1000
-                    for data in results_df.values()
-                ],
-                labels=results_df.keys(),
+                [data["ik_time"][data["reached"]] * 1000 for data in arrays.values()],
+                labels=arrays.keys(),
             )
             plt.show()
 
     for robot, robot_data in results.items():
         plt.title("Cumulative solve rates")
         plt.ylim(0, 1)
-        results_df = {}
+        arrays = {}
         for scenario, scenario_data in robot_data.items():
             for solver, data in scenario_data.items():
-                results_df[f"{solver}_{scenario}"] = result_to_df(data[0])
+                arrays[f"{solver}_{scenario}"] = as_result_array(data)
 
-        max_ik_time = max([np.max(data.ik_time) for data in results_df.values()]) * 1000
+        max_ik_time = max([np.max(data["ik_time"]) for data in arrays.values()]) * 1000
         for scenario in robot_data:
             plt.gca().set_prop_cycle(None)  # reset colors
             for solver in scenario_data:
-                data = results_df[f"{solver}_{scenario}"]
+                data = arrays[f"{solver}_{scenario}"]
                 linestyle = "dashed" if scenario.endswith("seed") else "solid"
+                x, y = steps(
+                    np.sort(data["ik_time"][data["reached"]] * 1000),
+                    len(data),
+                    upper=max_ik_time,
+                )
                 plt.plot(
-                    np.append(
-                        np.sort(data.ik_time[data.reached == 1] * 1000), max_ik_time
-                    ),
-                    np.append(
-                        np.arange(np.sum(data.reached == 1)),
-                        np.sum(data.reached == 1) - 1,
-                    )
-                    / (len(data) - 1),
+                    x,
+                    y,
                     label=solver,
                     linestyle=linestyle,
+                    drawstyle="steps-post",
                 )
         plt.xlabel("Time (ms)")
         plt.ylabel("Fraction solved")
@@ -140,465 +183,450 @@ def generate_plot(
     scenarios,
     robot,
     output_prefix,
+    filters=None,
+    data=None,
+    tolerance=DOWNSAMPLE_TOLERANCE,
+    confidence=0.95,
 ):
-    with sqlite3.connect("results.db") as conn:
-        cur = conn.cursor()
-        time_plot = plt.figure()
-        time_ax = time_plot.subplots()
-        if len(os.path.commonprefix(scenarios)) > 3:  # implicit if there is only one
-            title_suffix = f", {robot} on {os.path.commonprefix(scenarios)}"
-        elif len(solvers) == 1:
-            title_suffix = f", {robot} using {solvers[0]}"
-        else:
-            title_suffix = f" on {robot}"
-        time_ax.set_title("Cumulative solve rates" + title_suffix)
-        time_ax.set_ylim(0, 1)
-        it_plot = plt.figure()
-        it_ax = it_plot.subplots()
-        it_ax.set_title("Solver iterations" + title_suffix)
-        it_ax.set_ylim(0, 1)
-        bar_plot = plt.figure()
-        bar_ax = bar_plot.subplots()
-        bar_ax.set_title("Solve rates" + title_suffix)
-        bar_ax.set_ylim(0, 1)
-        total_count_max = 0
-        if not colors:
-            solver_colors = COLORS[: len(solvers)]
-        elif colors == ["fixed"]:
-            solver_colors = get_solver_colors(solvers)
-        else:
-            solver_colors = colors
-        if "KDL" not in solvers and get(colors, 0) == "fixed":
-            solvers.append("KDL")
-            solver_colors.extend(get_solver_colors(["KDL"]))
-            append_kdl = True
-        else:
-            append_kdl = False
-        bar_dict = {}
-        for s, scenario in enumerate(scenarios):
-            for i, solver in enumerate(solvers):
-                if append_kdl and solver == "KDL" and "seed" in scenario.lower():
-                    continue
-                ti = s * len(solvers) + i
-                solver_label = get(solver_labels, ti)
-                solver_color = solver_colors[i]
-                n_avg = 3
-                cur.execute(
-                    "SELECT id FROM experiments WHERE scenario = ? AND robot = ? AND solver = ? ORDER BY id DESC LIMIT ?",
-                    (scenario, robot, solver, n_avg),
+    # the bands show the confidence intervals of the solve rates of all
+    # repetitions together, or their min/max without a confidence
+    if data is None:
+        data = get_dataset(filters)
+    time_plot = plt.figure()
+    time_ax = time_plot.subplots()
+    if len(os.path.commonprefix(scenarios)) > 3:  # implicit if there is only one
+        title_suffix = f", {robot} on {os.path.commonprefix(scenarios)}"
+    elif len(solvers) == 1:
+        title_suffix = f", {robot} using {solvers[0]}"
+    else:
+        title_suffix = f" on {robot}"
+    time_ax.set_title("Cumulative solve rates" + title_suffix)
+    time_ax.set_ylim(0, 1)
+    it_plot = plt.figure()
+    it_ax = it_plot.subplots()
+    it_ax.set_title("Solver iterations" + title_suffix)
+    it_ax.set_ylim(0, 1)
+    bar_plot = plt.figure()
+    bar_ax = bar_plot.subplots()
+    bar_ax.set_title("Solve rates" + title_suffix)
+    bar_ax.set_ylim(0, 1)
+    total_count_max = 0
+    if not colors:
+        solver_colors = COLORS[: len(solvers)]
+    elif colors == ["fixed"]:
+        solver_colors = get_solver_colors(solvers)
+    else:
+        solver_colors = colors
+    if "KDL" not in solvers and get(colors, 0) == "fixed":
+        solvers.append("KDL")
+        solver_colors.extend(get_solver_colors(["KDL"]))
+        append_kdl = True
+    else:
+        append_kdl = False
+    bar_dict = {}
+    bar_intervals = {}
+    time_curves = []
+    it_curves = []
+    for s, scenario in enumerate(scenarios):
+        for i, solver in enumerate(solvers):
+            if append_kdl and solver == "KDL" and "seed" in scenario.lower():
+                continue
+            ti = s * len(solvers) + i
+            solver_label = get(solver_labels, ti)
+            solver_color = solver_colors[i]
+            n_avg = 3
+            experiment_ids = data.experiment_ids(robot, scenario, solver, n_avg)
+            use_avg = True
+            if len(experiment_ids) == 0:
+                print(f"Skipping {solver} on {scenario} because it does not exist")
+                continue
+            elif len(experiment_ids) < 3:
+                print(
+                    f"Warning: {solver} on {scenario} only has {len(experiment_ids)} runs!"
+                )
+                use_avg = False
+
+            summaries = data.summaries(experiment_ids)
+            max_time = max(summary.time_max for summary in summaries.values())
+            max_count = max(summary.iterations_max for summary in summaries.values())
+
+            grid = evaluation_grid(
+                [summary.sorted_times for summary in summaries.values()],
+                upper=max_time,
+            )
+            xs = grid * 1000
+            its = np.arange(0, max_count + 1)
+            cdfs = []
+            count_cdfs = []
+            for summary in summaries.values():
+                cdfs.append(ecdf(summary.sorted_times, grid, summary.num_results))
+                count_cdfs.append(
+                    ecdf(summary.reached_iterations(), its, summary.num_results)
                 )
-                fetch_result = cur.fetchall()
+            mean_cdf, min_cdf, max_cdf = envelope(cdfs)
+            count_mean, count_min, count_max = envelope(count_cdfs)
+            if confidence is not None:
+                # the curves are the pooled rates the intervals are centered
+                # on, with repetitions of different sizes the mean of their
+                # rates can lie outside of the intervals
                 use_avg = True
-                if len(fetch_result) == 0:
-                    print(f"Skipping {solver} on {scenario} because it does not exist")
-                    continue
-                elif len(fetch_result) < 3:
-                    print(
-                        f"Warning: {solver} on {scenario} only has {len(fetch_result)} runs!"
-                    )
-                    use_avg = False
-
-                experiment_ids = [r[0] for r in fetch_result]
-                cur.execute(
-                    "SELECT MAX(ik_time), MAX(solution_callback_count) FROM results WHERE experiment_id IN ({})".format(
-                        ",".join("?" * len(experiment_ids))
-                    ),
-                    experiment_ids,
+                targets, times, iterations = pool_results(experiment_ids)
+                mean_cdf, min_cdf, max_cdf = ecdf_intervals(
+                    times, targets, grid, confidence
                 )
-                max_time, max_count = cur.fetchone()
-
-                cdfs = []
-                count_cdfs = []
-                xs = np.arange(0, int(max_time * 100000)) / 100
-                for experiment_id in experiment_ids:
-                    cur.execute(
-                        "SELECT reached, ik_time, solution_callback_count FROM results WHERE experiment_id = ?",
-                        (experiment_id,),
-                    )
-                    results = cur.fetchall()
-                    reached, ik_time, count = np.array(results).T
-                    times = np.sort(ik_time[reached == 1] * 1000)
-                    times = (
-                        np.histogram(
-                            times, bins=np.arange(0, int(max_time * 100000) + 1) / 100
-                        )[0].cumsum()
-                        / 1000
-                    )
-                    if len(times) == 0:
-                        times = np.zeros_like(xs)
-                    else:
-                        times = np.pad(
-                            times, (0, int(max_time * 100000) - len(times)), "edge"
-                        )
-                    cdfs.append(times)
-
-                    iterations = np.sort(count[reached == 1])
-                    if len(iterations) == 0:
-                        counts = np.zeros(max_count)
-                    else:
-                        counts, _ = np.histogram(
-                            count[reached == 1],
-                            bins=np.arange(iterations.min(), iterations.max() + 2),
-                        )
-                        counts = np.pad(counts, (0, max_count - len(counts)), "edge")
-                    count_cdfs.append(np.concatenate([[0], np.cumsum(counts) / 1000]))
-
-                if solver_label:
-                    label = solver_label
-                elif len(scenarios) > 1 and len(solvers) > 1:
-                    label = f"{solver} on {scenario}"
-                elif len(scenarios) > 1:
-                    label = scenario
-                else:
-                    label = solver
-
-                cdfs = np.vstack(cdfs)
-                mean_cdf = np.mean(cdfs, axis=0)
-                min_cdf = np.min(cdfs, axis=0)
-                max_cdf = np.max(cdfs, axis=0)
-                if (
-                    get(solver_styles, ti, "solid") == "solid"
-                    and "seed" in scenario.lower()
-                ):
-                    style = "dotted"
-                else:
-                    style = get(solver_styles, ti, "solid")
-                time_ax.plot(
-                    xs,
-                    mean_cdf,
-                    label=label,
-                    color=solver_color,
-                    linestyle=style,
-                    alpha=1 if not (solver == "KDL" and append_kdl) else 0.3,
+                count_mean, count_min, count_max = ecdf_intervals(
+                    iterations, targets, its, confidence
                 )
-                if use_avg:
-                    time_ax.fill_between(
-                        xs,
-                        min_cdf,
-                        max_cdf,
-                        alpha=0.2,
-                        color=solver_color,
-                    )
 
-                count_cdfs = np.vstack(count_cdfs)
-                count_mean = np.mean(count_cdfs, axis=0)
-                count_min = np.min(count_cdfs, axis=0)
-                count_max = np.max(count_cdfs, axis=0)
-                it_ax.plot(
-                    np.arange(0, max_count + 1),
+            if solver_label:
+                label = solver_label
+            elif len(scenarios) > 1 and len(solvers) > 1:
+                label = f"{solver} on {scenario}"
+            elif len(scenarios) > 1:
+                label = scenario
+            else:
+                label = solver
+
+            if (
+                get(solver_styles, ti, "solid") == "solid"
+                and "seed" in scenario.lower()
+            ):
+                style = "dotted"
+            else:
+                style = get(solver_styles, ti, "solid")
+            line_style = {
+                "label": label,
+                "color": solver_color,
+                "linestyle": style,
+                "alpha": 1 if not (solver == "KDL" and append_kdl) else 0.3,
+            }
+            time_curves.append(
+                (xs, mean_cdf, (min_cdf, max_cdf) if use_avg else None, line_style)
+            )
+
+            it_curves.append(
+                (
+                    its,
                     count_mean,
-                    label=label,
-                    color=solver_color,
-                    linestyle=style,
-                    alpha=1 if not (solver == "KDL" and append_kdl) else 0.3,
+                    (count_min, count_max) if use_avg else None,
+                    line_style,
                 )
-                if use_avg:
-                    it_ax.fill_between(
-                        np.arange(0, max_count + 1),
-                        count_min,
-                        count_max,
-                        alpha=0.2,
-                        color=solver_color,
-                    )
-
-                total_count_max = max(total_count_max, max_count)
-                if len(mean_cdf) == 0:
-                    bar_dict[label] = 0
-                else:
-                    bar_dict[label] = np.max(mean_cdf)
-        time_ax.set_xlabel("Duration (ms)")
-        time_ax.set_ylabel("Fraction solved")
-        time_ax.legend()
-        time_ax.set_xlim(0, 1000)
-        time_plot.savefig(f"{output_prefix}.png", dpi=300, bbox_inches="tight")
-        time_ax.set_xlim(0, 100)
-        time_plot.savefig(f"{output_prefix}_100.png", dpi=300, bbox_inches="tight")
-        time_ax.set_xlim(0, 50)
-        time_plot.savefig(f"{output_prefix}_detail.png", dpi=300, bbox_inches="tight")
-        time_ax.set_xlim(0, 5)
-        time_plot.savefig(f"{output_prefix}_detail2.png", dpi=300, bbox_inches="tight")
-        plt.close(time_plot)
-
-        it_ax.set_xlabel("Iterations")
-        it_ax.set_ylabel("Fraction solved")
-        it_ax.legend()
-        it_ax.set_xlim(0, total_count_max)
-        it_plot.savefig(
-            f"{output_prefix}_iterations.png",
-            dpi=300,
-            bbox_inches="tight",
-        )
-        it_ax.set_xlim(0, 100)
-        it_plot.savefig(
-            f"{output_prefix}_iterations_detail.png",
-            dpi=300,
-            bbox_inches="tight",
-        )
-        it_ax.set_xlim(0, 10)
-        it_plot.savefig(
-            f"{output_prefix}_iterations_detail2.png",
-            dpi=300,
-            bbox_inches="tight",
-        )
-        plt.close(it_plot)
+            )
 
-        bar_ax.bar(
-            bar_dict.keys(),
-            bar_dict.values(),
-            color=solver_colors,
-        )
-        bar_plot.savefig(
-            f"{output_prefix}_bar.png",
-            dpi=300,
-            bbox_inches="tight",
-        )
-        plt.close(bar_plot)
-
-
-def generate_table(solvers, solver_labels, scenarios, robot, output_prefix):
-    with sqlite3.connect("results.db") as conn:
-        cur = conn.cursor()
-        time_table = ""
-        count_table = ""
-        durations = {0.005: [], 0.01: [], 0.1: [], 1: []}
-        iterations = {1: [], 2: [], 3: [], 5: [], 10: [], 100: []}
-        time_table += (
-            'table.header("Duration", '
-            + ", ".join([f'"{int(x*1000)}ms"' for x in durations])
-            + ', "Mean"),\n'
-        )
-        count_table += (
-            'table.header("Iterations", '
-            + ", ".join([f'"{x}"' for x in iterations])
-            + ', "Mean"),\n'
-        )
-        for scenario in scenarios:
-            for solver, solver_label in zip_longest(solvers, solver_labels):
-                n_avg = 3
-                cur.execute(
-                    "SELECT id FROM experiments WHERE scenario = ? AND robot = ? AND solver = ? ORDER BY id DESC LIMIT ?",
-                    (scenario, robot, solver, n_avg),
+            total_count_max = max(total_count_max, max_count)
+            if confidence is not None:
+                rate, low, high = ecdf_intervals(times, targets, np.inf, confidence)
+                bar_dict[label] = rate
+                bar_intervals[label] = (low, high)
+            elif len(mean_cdf) == 0:
+                bar_dict[label] = 0
+            else:
+                bar_dict[label] = np.max(mean_cdf)
+    time_ax.set_xlabel("Duration (ms)")
+    time_ax.set_ylabel("Fraction solved")
+    outputs = save_views(
+        time_plot,
+        time_ax,
+        time_curves,
+        [
+            (1000, f"{output_prefix}.png"),
+            (100, f"{output_prefix}_100.png"),
+            (50, f"{output_prefix}_detail.png"),
+            (5, f"{output_prefix}_detail2.png"),
+        ],
+        tolerance,
+    )
+    plt.close(time_plot)
+
+    it_ax.set_xlabel("Iterations")
+    it_ax.set_ylabel("Fraction solved")
+    outputs += save_views(
+        it_plot,
+        it_ax,
+        it_curves,
+        [
+            (total_count_max, f"{output_prefix}_iterations.png"),
+            (100, f"{output_prefix}_iterations_detail.png"),
+            (10, f"{output_prefix}_iterations_detail2.png"),
+        ],
+        tolerance,
+    )
+    plt.close(it_plot)
+
+    if bar_intervals:
+        errors = [
+            [bar_dict[label] - bar_intervals[label][0] for label in bar_dict],
+            [bar_intervals[label][1] - bar_dict[label] for label in bar_dict],
+        ]
+    else:
+        errors = None
+    bar_ax.bar(
+        bar_dict.keys(),
+        bar_dict.values(),
+        color=solver_colors,
+        yerr=errors,
+        capsize=3,
+    )
+    bar_plot.savefig(
+        f"{output_prefix}_bar.png",
+        dpi=300,
+        bbox_inches="tight",
+    )
+    plt.close(bar_plot)
+    return outputs + [f"{output_prefix}_bar.png"]
+
+
+def generate_table(
+    solvers,
+    solver_labels,
+    scenarios,
+    robot,
+    output_prefix,
+    filters=None,
+    data=None,
+    confidence=0.95,
+):
+    # with a confidence, the rates of all repetitions together are given with
+    # their intervals and the median solve time with Woodruff's interval, both
+    # with the targets as the sampling units
+    if data is None:
+        data = get_dataset(filters)
+    time_table = ""
+    count_table = ""
+    durations = {0.005: [], 0.01: [], 0.1: [], 1: []}
+    iterations = {1: [], 2: [], 3: [], 5: [], 10: [], 100: []}
+    time_columns = len(durations) + (1 if confidence is None else 2)
+    time_table += (
+        'table.header("Duration", '
+        + ", ".join([f'"{int(x*1000)}ms"' for x in durations])
+        + (', "Mean"),\n' if confidence is None else ', "Mean", "Median"),\n')
+    )
+    count_table += (
+        'table.header("Iterations", '
+        + ", ".join([f'"{x}"' for x in iterations])
+        + ', "Mean"),\n'
+    )
+    for scenario in scenarios:
+        for solver, solver_label in zip_longest(solvers, solver_labels):
+            n_avg = 3
+            experiment_ids = data.experiment_ids(robot, scenario, solver, n_avg)
+            if len(experiment_ids) == 0:
+                print(f"Skipping {solver} on {scenario} because it does not exist")
+                continue
+            elif len(experiment_ids) < 3:
+                print(
+                    f"Warning: {solver} on {scenario} only has {len(experiment_ids)} runs!"
                 )
-                fetch_result = cur.fetchall()
-                if len(fetch_result) == 0:
-                    print(f"Skipping {solver} on {scenario} because it does not exist")
-                    continue
-                elif len(fetch_result) < 3:
-                    print(
-                        f"Warning: {solver} on {scenario} only has {len(fetch_result)} runs!"
-                    )
-
-                experiment_ids = [r[0] for r in fetch_result]
 
-                for arr in durations.values():
-                    arr.clear()
-                for arr in iterations.values():
-                    arr.clear()
-                dur_means = []
-                it_means = []
-
-                for experiment_id in experiment_ids:
-                    cur.execute(
-                        "SELECT reached, ik_time, solution_callback_count FROM results WHERE experiment_id = ?",
-                        (experiment_id,),
-                    )
-                    results = cur.fetchall()
-                    reached, ik_time, count = np.array(results).T
-
-                    for dur, arr in durations.items():
-                        arr.append(np.sum(ik_time[reached == 1] <= dur) / len(reached))
-                    if np.sum([reached == 1]) > 0:
-                        dur_means.append(np.mean(ik_time[reached == 1]))
-                        it_means.append(np.mean(count[reached == 1]))
-                    else:
-                        dur_means.append(0)
-                        it_means.append(0)
-                    for nit, arr in iterations.items():
-                        arr.append(np.sum(count[reached == 1] <= nit) / len(reached))
-
-                if len(scenarios) > 1 and len(solvers) > 1:
-                    label = f"{solver_label or solver} on {scenario}"
-                elif len(scenarios) > 1:
-                    label = scenario
+            for arr in durations.values():
+                arr.clear()
+            for arr in iterations.values():
+                arr.clear()
+            dur_means = []
+            it_means = []
+
+            summaries = data.summaries(experiment_ids)
+            for experiment_id in experiment_ids:
+                summary = summaries[experiment_id]
+                count = summary.reached_iterations()
+
+                for dur, arr in durations.items():
+                    arr.append(summary.solved_within(dur) / summary.num_results)
+                if summary.reached > 0:
+                    dur_means.append(summary.time_mean)
+                    it_means.append(summary.iterations_mean)
                 else:
-                    label = solver_label or solver
-
-                time_table += f'"{label}", '
+                    dur_means.append(0)
+                    it_means.append(0)
+                for nit, arr in iterations.items():
+                    arr.append(np.sum(count <= nit) / summary.num_results)
+
+            if len(scenarios) > 1 and len(solvers) > 1:
+                label = f"{solver_label or solver} on {scenario}"
+            elif len(scenarios) > 1:
+                label = scenario
+            else:
+                label = solver_label or solver
+
+            time_table += f'"{label}", '
+            count_table += f'"{label}", '
+            if confidence is None:
                 for arr in durations.values():
                     time_table += f'"{np.mean(arr)*100:.1f}%", '
                 time_table += f'"{np.mean(dur_means)*1000:.3f}ms",\n'
-                count_table += f'"{label}", '
                 for arr in iterations.values():
                     count_table += f'"{np.mean(arr)*100:.1f}%", '
-                count_table += f'"{np.mean(it_means):.3f} its",\n'
-        with open(output_prefix + ".txt", "w") as text_file:
-            text_file.write(
-                '#figure(\nplacement: auto,\ncaption: "",\ngrid(inset: 5pt,\n'
-            )
-            text_file.write(
-                "table(columns: (auto," + " 1fr," * (len(durations) + 1) + "),\n"
-            )
-            text_file.write(time_table)
-            text_file.write("),\n")
-            text_file.write(
-                "table(columns: (auto," + " 1fr," * (len(iterations) + 1) + "),\n"
-            )
-            text_file.write(count_table)
-            text_file.write(")))")
+            else:
+                targets, times, reached_iterations = pool_results(experiment_ids)
+                for rate, low, high in zip(
+                    *ecdf_intervals(times, targets, list(durations), confidence)
+                ):
+                    time_table += f'"{rate*100:.1f}% ({low*100:.1f}-{high*100:.1f})", '
+                time_table += f'"{np.mean(dur_means)*1000:.3f}ms", '
+                median, low, high = quantile_interval(times, targets, 0.5, confidence)
+                time_table += (
+                    f'"{median*1000:.3f}ms ({low*1000:.3f}-{high*1000:.3f})",\n'
+                )
+                for rate, low, high in zip(
+                    *ecdf_intervals(
+                        reached_iterations, targets, list(iterations), confidence
+                    )
+                ):
+                    count_table += f'"{rate*100:.1f}% ({low*100:.1f}-{high*100:.1f})", '
+            count_table += f'"{np.mean(it_means):.3f} its",\n'
+    with open(output_prefix + ".txt", "w") as text_file:
+        text_file.write('#figure(\nplacement: auto,\ncaption: "",\ngrid(inset: 5pt,\n')
+        text_file.write("table(columns: (auto," + " 1fr," * time_columns + "),\n")
+        text_file.write(time_table)
+        text_file.write("),\n")
+        text_file.write(
+            "table(columns: (auto," + " 1fr," * (len(iterations) + 1) + "),\n"
+        )
+        text_file.write(count_table)
+        text_file.write(")))")
+    return output_prefix + ".txt"
 
 
-def plot_from_db(solvers_=[]):
+def plot_from_db(
+    solvers_=[], filters=None, data=None, force=False, tolerance=DOWNSAMPLE_TOLERANCE
+):
     if not os.path.exists("results"):
         os.mkdir("results")
-    with sqlite3.connect("results.db") as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT DISTINCT scenario, robot FROM experiments")
-        experiment_data = cur.fetchall()
-        for scenario, robot in experiment_data:
-            cur.execute(
-                "SELECT DISTINCT solver FROM experiments WHERE scenario = ? AND robot = ?",
-                (scenario, robot),
-            )
-            solvers = cur.fetchall()
-
-            # filter bio ik
-            def is_bio_ik(s):
-                if not s.startswith("BioIK") and not s.startswith("Bio_ik"):
-                    return False
-                if s.startswith("BioIK "):
-                    return False
-                return True
-
-            # solvers = [s for s in solvers if is_bio_ik(s[0])]
-            if solvers_:
-                solvers = [s for s in solvers if s[0] in solvers_]
-
-            print(scenario)
-            print('table.header("Duration", "5ms", "10ms", "100ms", "1000ms", "Mean"),')
-            plt.title(f"Cumulative solve rates, {robot} on {scenario}")
-            plt.ylim(0, 1)
-            for i, (solver,) in enumerate(solvers):
-                cur.execute(
-                    "SELECT id FROM experiments WHERE scenario = ? AND robot = ? AND solver = ?",
-                    (scenario, robot, solver),
-                )
-                experiment_ids = cur.fetchall()
-                solve_rates_5ms = []
-                solve_rates_10ms = []
-                solve_rates_100ms = []
-                solve_rates_1000ms = []
-                time_means = []
-                for (experiment_id,) in experiment_ids:
-                    cur.execute(
-                        "SELECT reached, ik_time FROM results WHERE experiment_id = ?",
-                        (experiment_id,),
-                    )
-                    results = cur.fetchall()
-                    reached, ik_time = np.array(results).T
-                    if np.sum(reached == 1) > 0:
-                        plt.plot(
-                            np.sort(ik_time[reached == 1] * 1000),
-                            np.arange(np.sum(reached == 1)) / (len(reached) - 1),
-                            label=solver.split()[0],
-                            linestyle="solid",
-                            color=plt.cm.tab10(i),
+    if data is None:
+        data = get_dataset(filters)
+    for scenario, robot in data.cells():
+        solvers = [(solver,) for solver in data.solvers(robot, scenario)]
+
+        # filter bio ik
+        def is_bio_ik(s):
+            if not s.startswith("BioIK") and not s.startswith("Bio_ik"):
+                return False
+            if s.startswith("BioIK "):
+                return False
+            return True
+
+        # solvers = [s for s in solvers if is_bio_ik(s[0])]
+        if solvers_:
+            solvers = [s for s in solvers if s[0] in solvers_]
+
+        output_prefix = f"results/{scenario}_{robot}"
+        inputs = fingerprint(
+            {
+                solver: data.experiment_ids(robot, scenario, solver)
+                for (solver,) in solvers
+            },
+            {"filters": data.filters},
+        )
+        if not force and is_up_to_date(output_prefix, inputs):
+            print(f"{scenario} on {robot} is up to date")
+            continue
+
+        print(scenario)
+        print('table.header("Duration", "5ms", "10ms", "100ms", "1000ms", "Mean"),')
+        plt.title(f"Cumulative solve rates, {robot} on {scenario}")
+        plt.ylim(0, 1)
+        curves = []
+        for i, (solver,) in enumerate(solvers):
+            experiment_ids = data.experiment_ids(robot, scenario, solver)
+            solve_rates_5ms = []
+            solve_rates_10ms = []
+            solve_rates_100ms = []
+            solve_rates_1000ms = []
+            time_means = []
+            summaries = data.summaries(experiment_ids)
+            for summary in summaries.values():
+                n = summary.num_results
+                if summary.reached > 0:
+                    x, y = steps(summary.sorted_times, n)
+                    curves.append(
+                        (
+                            x * 1000,
+                            y,
+                            None,
+                            {
+                                "label": solver.split()[0],
+                                "linestyle": "solid",
+                                "color": plt.cm.tab10(i),
+                            },
                         )
-                    solve_rates_5ms.append(
-                        np.sum(ik_time[reached == 1] <= 0.005) / len(ik_time)
-                    )
-                    solve_rates_10ms.append(
-                        np.sum(ik_time[reached == 1] <= 0.01) / len(ik_time)
-                    )
-                    solve_rates_100ms.append(
-                        np.sum(ik_time[reached == 1] <= 0.1) / len(ik_time)
                     )
-                    solve_rates_1000ms.append(
-                        np.sum(ik_time[reached == 1] <= 1.0) / len(ik_time)
-                    )
-                    time_means.append(np.mean(ik_time))
-                print(f'"{solver} ({len(experiment_ids)})", ', end="")
-                print(
-                    f'"{np.mean(solve_rates_5ms):.3f}", "{np.mean(solve_rates_10ms):.3f}", "{np.mean(solve_rates_100ms):.3f}", "{np.mean(solve_rates_1000ms):.3f}", "{np.mean(time_means) * 1000:.3f} ms",'
-                )
-            plt.xlabel("Duration (ms)")
-            plt.ylabel("Fraction solved")
-            # hide duplicate legend entries
-            ax = plt.gca()
-            entries = set()
-            for p in ax.get_lines():
-                if p.get_label() in entries:
-                    p.set_label("_" + p.get_label())
-                entries.add(p.get_label())
-            plt.legend()
-            plt.xlim(0, 1000)
-            plt.savefig(f"results/{scenario}_{robot}.png", dpi=300, bbox_inches="tight")
-            plt.xlim(0, 50)
-            plt.savefig(
-                f"results/{scenario}_{robot}_detail.png", dpi=300, bbox_inches="tight"
+                solve_rates_5ms.append(summary.solved_within(0.005) / n)
+                solve_rates_10ms.append(summary.solved_within(0.01) / n)
+                solve_rates_100ms.append(summary.solved_within(0.1) / n)
+                solve_rates_1000ms.append(summary.solved_within(1.0) / n)
+                time_means.append(summary.time_mean_all)
+            print(f'"{solver} ({len(experiment_ids)})", ', end="")
+            print(
+                f'"{np.mean(solve_rates_5ms):.3f}", "{np.mean(solve_rates_10ms):.3f}", "{np.mean(solve_rates_100ms):.3f}", "{np.mean(solve_rates_1000ms):.3f}", "{np.mean(time_means) * 1000:.3f} ms",'
             )
-            plt.xlim(0, 5)
-            plt.savefig(
-                f"results/{scenario}_{robot}_detail2.png", dpi=300, bbox_inches="tight"
-            )
-            plt.close()
-
-            # solution callback count
-            plt.title(f"Solver iterations, {robot} on {scenario}")
-            plt.ylim(0, 1)
-            print('table.header("Solver", "1", "2", "3", "5", "10", "100", "Mean"),')
-            count_max = 0
-            for i, (solver,) in enumerate(solvers):
-                cur.execute(
-                    "SELECT id FROM experiments WHERE scenario = ? AND robot = ? AND solver = ?",
-                    (scenario, robot, solver),
-                )
-                experiment_ids = cur.fetchall()
-                iterations = {1: [], 2: [], 3: [], 5: [], 10: [], 100: []}
-                count_means = []
-                for (experiment_id,) in experiment_ids:
-                    cur.execute(
-                        "SELECT reached, solution_callback_count FROM results WHERE experiment_id = ?",
-                        (experiment_id,),
-                    )
-                    results = cur.fetchall()
-                    reached, count = np.array(results).T
-                    if np.sum(reached == 1) > 0:
-                        plt.plot(
-                            np.sort(count[reached == 1]),
-                            np.arange(np.sum(reached == 1)) / (len(reached) - 1),
-                            label=solver,
-                            linestyle="solid",
-                            color=plt.cm.tab10(i),
+        plt.xlabel("Duration (ms)")
+        plt.ylabel("Fraction solved")
+        hide_duplicate_labels(curves)
+        outputs = save_views(
+            plt.gcf(),
+            plt.gca(),
+            curves,
+            [
+                (1000, f"{output_prefix}.png"),
+                (50, f"{output_prefix}_detail.png"),
+                (5, f"{output_prefix}_detail2.png"),
+            ],
+            tolerance,
+        )
+        plt.close()
+
+        # solution callback count
+        plt.title(f"Solver iterations, {robot} on {scenario}")
+        plt.ylim(0, 1)
+        print('table.header("Solver", "1", "2", "3", "5", "10", "100", "Mean"),')
+        count_max = 0
+        curves = []
+        for i, (solver,) in enumerate(solvers):
+            experiment_ids = data.experiment_ids(robot, scenario, solver)
+            iterations = {1: [], 2: [], 3: [], 5: [], 10: [], 100: []}
+            count_means = []
+            summaries = data.summaries(experiment_ids)
+            for summary in summaries.values():
+                count = summary.reached_iterations()
+                if summary.reached > 0:
+                    x, y = steps(count, summary.num_results)
+                    curves.append(
+                        (
+                            x,
+                            y,
+                            None,
+                            {
+                                "label": solver,
+                                "linestyle": "solid",
+                                "color": plt.cm.tab10(i),
+                            },
                         )
-                    if np.sum(count[reached == 1]) > 0:
-                        count_max = max(count_max, np.max(count[reached == 1]))
-                    for nit, arr in iterations.items():
-                        arr.append(np.sum(count[reached == 1] <= nit) / len(count))
-                    count_means.append(np.mean(count[reached == 1]))
-                print(f'"{solver} ({len(experiment_ids)})", ', end="")
+                    )
+                if np.sum(count) > 0:
+                    count_max = max(count_max, np.max(count))
                 for nit, arr in iterations.items():
-                    print(f'"{np.mean(arr):.3f}", ', end="")
-                print(f'"{np.mean(count_means):.3f} its",')
-            plt.xlabel("Iterations")
-            plt.ylabel("Fraction solved")
-            # hide duplicate legend entries
-            ax = plt.gca()
-            entries = set()
-            for p in ax.get_lines():
-                if p.get_label() in entries:
-                    p.set_label("_" + p.get_label())
-                entries.add(p.get_label())
-            plt.legend()
-            plt.xlim(0, count_max)
-            plt.savefig(
-                f"results/{scenario}_{robot}_iterations.png",
-                dpi=300,
-                bbox_inches="tight",
-            )
-            plt.xlim(0, 10)
-            plt.savefig(
-                f"results/{scenario}_{robot}_iterations_detail.png",
-                dpi=300,
-                bbox_inches="tight",
-            )
-            plt.close()
+                    arr.append(np.sum(count <= nit) / summary.num_results)
+                count_means.append(
+                    np.nan
+                    if summary.iterations_mean is None
+                    else summary.iterations_mean
+                )
+            print(f'"{solver} ({len(experiment_ids)})", ', end="")
+            for nit, arr in iterations.items():
+                print(f'"{np.mean(arr):.3f}", ', end="")
+            print(f'"{np.mean(count_means):.3f} its",')
+        plt.xlabel("Iterations")
+        plt.ylabel("Fraction solved")
+        hide_duplicate_labels(curves)
+        outputs += save_views(
+            plt.gcf(),
+            plt.gca(),
+            curves,
+            [
+                (count_max, f"{output_prefix}_iterations.png"),
+                (10, f"{output_prefix}_iterations_detail.png"),
+            ],
+            tolerance,
+        )
+        plt.close()
+        write_manifest(output_prefix, inputs, outputs)
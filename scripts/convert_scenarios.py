@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+import argparse
+import glob
+import os
+
+import numpy as np
+
+from ebike.scenario import read_pcd, write_pcd
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help="PCD files to convert, all scenarios by default",
+    )
+    parser.add_argument("--data", choices=["ascii", "binary"], default="binary")
+    args = parser.parse_args()
+    files = args.files or sorted(
+        glob.glob(os.path.join(os.path.dirname(__file__), "..", "scenarios", "*.pcd"))
+    )
+    for file_name in files:
+        fields, points = read_pcd(file_name)
+        # the points may be memory-mapped from the file that is replaced
+        points = np.array(points)
+        write_pcd(file_name + ".tmp", fields, points, args.data)
+        os.replace(file_name + ".tmp", file_name)
+        print(f"Converted {file_name} ({len(points)} points) to {args.data}")
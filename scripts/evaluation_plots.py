@@ -1,50 +1,183 @@
 #!/usr/bin/python3
+import argparse
+import copy
+import multiprocessing
 import os
+import traceback
 
+import matplotlib
+import matplotlib.pyplot as plt
+
+from ebike.dataset import get_dataset
+from ebike.manifest import fingerprint, is_up_to_date, write_manifest
 from ebike.visualization import generate_plot, generate_table
 
 RESULTS_DIR = "results"
 
+_data = {}
+
+
+def read_config(folder):
+    config_file = os.path.join(RESULTS_DIR, folder, "config.txt")
+    plots = []
+    solver_labels = []
+    solver_colors = []
+    solver_styles = []
+    filters = {}
+    confidence = 0.95
+    with open(config_file, "r") as f:
+        robot = f.readline().strip()
+        solvers = f.readline().strip().split(",")
+        for line in f.readlines():
+            line = line.strip()
+            if line.startswith("labels:"):
+                solver_labels = line[len("labels:") :].split(",")
+            elif line.startswith("colors:"):
+                solver_colors = line[len("colors:") :].split(",")
+            elif line.startswith("styles:"):
+                solver_styles = line[len("styles:") :].split(",")
+            elif line.startswith("filters:"):
+                filters = dict(
+                    f.split("=", 1) for f in line[len("filters:") :].split(",")
+                )
+            elif line.startswith("confidence:"):
+                # "none" shows the min/max of the repetitions instead
+                value = line[len("confidence:") :]
+                confidence = None if value == "none" else float(value)
+            else:
+                plots.append(line.split(","))
+    return {
+        "robot": robot,
+        "solvers": solvers,
+        "labels": solver_labels,
+        "colors": solver_colors,
+        "styles": solver_styles,
+        "filters": filters,
+        "confidence": confidence,
+        "plots": plots,
+    }
+
+
+def plot_inputs(folder, i, config):
+    # generate_plot adds KDL to the solvers for fixed colors
+    robot = config["robot"]
+    scenarios = config["plots"][i]
+    return fingerprint(
+        {
+            f"{scenario}/{solver}": _data[folder].experiment_ids(
+                robot, scenario, solver, 3
+            )
+            for scenario in scenarios
+            for solver in config["solvers"] + ["KDL"]
+        },
+        {
+            **{key: value for key, value in config.items() if key != "plots"},
+            "scenarios": scenarios,
+        },
+    )
+
+
+def render(job):
+    folder, i, config, inputs = job
+    # generate_plot adds KDL to the solvers, later groups need the original
+    config = copy.deepcopy(config)
+    scenarios = config["plots"][i]
+    data = _data[folder]
+    plot_prefix = os.path.join(RESULTS_DIR, folder, "plot_" + str(i))
+    table_prefix = os.path.join(RESULTS_DIR, folder, "table_" + str(i))
+    try:
+        plot_outputs = generate_plot(
+            config["solvers"],
+            config["labels"],
+            config["colors"],
+            config["styles"],
+            scenarios,
+            config["robot"],
+            plot_prefix,
+            data=data,
+            confidence=config["confidence"],
+        )
+        table_output = generate_table(
+            config["solvers"],
+            config["labels"],
+            scenarios,
+            config["robot"],
+            table_prefix,
+            data=data,
+            confidence=config["confidence"],
+        )
+    except Exception:
+        plt.close("all")
+        return folder, i, traceback.format_exc()
+    write_manifest(plot_prefix, inputs, plot_outputs)
+    write_manifest(table_prefix, inputs, [table_output])
+    return folder, i, None
+
+
 if __name__ == "__main__":
-    for folder in os.listdir(RESULTS_DIR):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes rendering plot groups in parallel",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Render all plot groups, even those whose inputs did not change",
+    )
+    args = parser.parse_args()
+    if args.jobs > 1:
+        matplotlib.use("Agg")
+
+    jobs = []
+    failed = []
+    for folder in sorted(os.listdir(RESULTS_DIR)):
         if not os.path.isdir(os.path.join(RESULTS_DIR, folder)):
             continue
         if folder.startswith("_"):
             continue
         if os.path.exists(os.path.join(RESULTS_DIR, folder, "SKIP")):
             continue
-        config_file = os.path.join(RESULTS_DIR, folder, "config.txt")
-        plots = []
-        solver_labels = []
-        solver_colors = []
-        solver_styles = []
-        with open(config_file, "r") as f:
-            robot = f.readline().strip()
-            solvers = f.readline().strip().split(",")
-            for line in f.readlines():
-                line = line.strip()
-                if line.startswith("labels:"):
-                    solver_labels = line[len("labels:") :].split(",")
-                elif line.startswith("colors:"):
-                    solver_colors = line[len("colors:") :].split(",")
-                elif line.startswith("styles:"):
-                    solver_styles = line[len("styles:") :].split(",")
-                else:
-                    plots.append(line.split(","))
-        for i, scenarios in enumerate(plots):
-            generate_plot(
-                solvers,
-                solver_labels,
-                solver_colors,
-                solver_styles,
-                scenarios,
-                robot,
-                os.path.join(RESULTS_DIR, folder, "plot_" + str(i)),
-            )
-            generate_table(
-                solvers,
-                solver_labels,
-                scenarios,
-                robot,
-                os.path.join(RESULTS_DIR, folder, "table_" + str(i)),
+        try:
+            config = read_config(folder)
+            # the experiments of all plots in the folder are loaded at once
+            data = get_dataset(config["filters"])
+            data.prefetch(
+                config["robot"],
+                [scenario for scenarios in config["plots"] for scenario in scenarios],
+                config["solvers"] + ["KDL"],
+                3,
+                results=config["confidence"] is not None,
             )
+        except Exception:
+            failed.append((folder, "config", traceback.format_exc()))
+            continue
+        _data[folder] = data
+        for i in range(len(config["plots"])):
+            inputs = plot_inputs(folder, i, config)
+            if (
+                args.force
+                or not is_up_to_date(
+                    os.path.join(RESULTS_DIR, folder, f"plot_{i}"), inputs
+                )
+                or not is_up_to_date(
+                    os.path.join(RESULTS_DIR, folder, f"table_{i}"), inputs
+                )
+            ):
+                jobs.append((folder, i, config, inputs))
+    print(f"Rendering {len(jobs)} plot groups")
+
+    if args.jobs > 1:
+        # forked workers inherit the preloaded summaries instead of reading
+        # results.db again
+        with multiprocessing.get_context("fork").Pool(args.jobs) as pool:
+            results = list(pool.imap_unordered(render, jobs))
+    else:
+        results = [render(job) for job in jobs]
+    failed.extend(result for result in results if result[2])
+    for folder, i, error in failed:
+        print(f"Plot {i} of {folder} failed:\n{error}")
+    if failed:
+        raise SystemExit(f"{len(failed)} plot groups failed")
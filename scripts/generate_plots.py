@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import argparse
 
+from ebike.store import export_experiments
 from ebike.visualization import plot_from_db
 
 if __name__ == "__main__":
@@ -8,5 +9,25 @@ if __name__ == "__main__":
     parser.add_argument(
         "--solvers", nargs="*", help="Names of solvers to generate plots of"
     )
+    parser.add_argument(
+        "--filter",
+        nargs="*",
+        default=[],
+        help="Only use experiments matching column=value, e.g. host=bench01",
+    )
+    parser.add_argument(
+        "--export-store",
+        action="store_true",
+        help="Write the results of older experiments to the columnar result store first",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate all plots, even those whose experiments did not change",
+    )
     args = parser.parse_args()
-    plot_from_db(args.solvers)
+    if args.export_store:
+        print(f"Exported {export_experiments()} experiments")
+    plot_from_db(
+        args.solvers, dict(f.split("=", 1) for f in args.filter), force=args.force
+    )
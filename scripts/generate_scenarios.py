@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+import argparse
+
+from ebike.generator import FAMILIES, GENERATED_DIR, generate_scenarios
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("family", choices=sorted(FAMILIES))
+    parser.add_argument(
+        "--sweep",
+        nargs="*",
+        default=[],
+        help="Values of parameters to generate all combinations of, e.g. shelves=2,3,4 width=0.6,0.9",
+    )
+    parser.add_argument("--directory", default=GENERATED_DIR)
+    args = parser.parse_args()
+    sweep = {}
+    for argument in args.sweep:
+        name, _, values = argument.partition("=")
+        sweep[name] = values.split(",")
+    for scenario in generate_scenarios(args.family, sweep, args.directory):
+        print(scenario.name, {name: scenario.parameters[name] for name in sweep})
@@ -1,16 +1,137 @@
 #!/usr/bin/env python
-from ebike.benchmark import Benchmark
+import argparse
+
+from ebike.benchmark import Benchmark, EarlyStopping, get_isolated_cpus
 from ebike.ik import KDL, BioIK, PickIK, TracIK
 from ebike.robot import UR10
 from ebike.scenario import Random
+from ebike.subsampling import METHODS
+
+# targets per scenario in smoke runs, spread over the cloud by the subsampling
+SMOKE_TARGETS = 50
 
 if __name__ == "__main__":
-    benchmark = Benchmark(interactive=True)
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Number of cells to run in parallel"
+    )
+    parser.add_argument(
+        "--cpus", type=int, nargs="+", help="CPU cores to pin the worker processes to"
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Number of chunks the targets of each scenario are split into",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip completed cells and continue partially finished ones",
+    )
+    parser.add_argument(
+        "--repetitions", type=int, default=1, help="Number of runs of each cell"
+    )
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=int,
+        help="Number of targets after which intermediate results are saved",
+    )
+    parser.add_argument(
+        "--keep-xml",
+        action="store_true",
+        help="Keep the reach.db.xml files written by REACH",
+    )
+    parser.add_argument(
+        "--early-stopping",
+        action="store_true",
+        help="Stop cells once success rate and median solve time have converged",
+    )
+    parser.add_argument(
+        "--rate-tolerance",
+        type=float,
+        default=0.1,
+        help="Maximum width of the success rate confidence interval, 0.1 needs about 400 targets at a 50%% success rate",
+    )
+    parser.add_argument(
+        "--time-tolerance",
+        type=float,
+        default=0.001,
+        help="Maximum width of the median solve time confidence interval (s)",
+    )
+    parser.add_argument(
+        "--warmup-targets",
+        type=int,
+        default=0,
+        help="Number of targets solved before each study that are not recorded",
+    )
+    parser.add_argument(
+        "--isolate",
+        action="store_true",
+        help="Pin the solvers to the cores isolated with the isolcpus kernel parameter",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Save results in batches and only keep summary statistics in memory",
+    )
+    parser.add_argument(
+        "--max-targets",
+        type=int,
+        help="Run a subsample of at most this many targets of each scenario",
+    )
+    parser.add_argument(
+        "--target-fraction",
+        type=float,
+        help="Run a subsample of this fraction of the targets of each scenario",
+    )
+    parser.add_argument(
+        "--subsampling",
+        choices=sorted(METHODS),
+        default="voxel",
+        help="How the targets are subsampled",
+    )
+    parser.add_argument(
+        "--smoke",
+        action="store_true",
+        help=f"Quick check of the whole matrix with {SMOKE_TARGETS} targets per scenario",
+    )
+    args, _ = parser.parse_known_args()
+    if args.smoke and args.max_targets is None and args.target_fraction is None:
+        args.max_targets = SMOKE_TARGETS
+    cpus = get_isolated_cpus() if args.isolate else args.cpus
+    early_stopping = None
+    if args.early_stopping:
+        early_stopping = EarlyStopping(args.rate_tolerance, args.time_tolerance)
+    # waiting for the user only makes sense for a single study per cell
+    interactive = (
+        args.workers == 1
+        and args.shards == 1
+        and args.checkpoint_interval is None
+        and early_stopping is None
+        and args.warmup_targets == 0
+        and not args.streaming
+    )
+    benchmark = Benchmark(
+        interactive=interactive,
+        workers=args.workers,
+        cpus=cpus,
+        shards=args.shards,
+        resume=args.resume,
+        repetitions=args.repetitions,
+        checkpoint_interval=args.checkpoint_interval,
+        keep_xml=args.keep_xml,
+        early_stopping=early_stopping,
+        warmup_targets=args.warmup_targets,
+        streaming=args.streaming,
+    )
     benchmark.add_ik(KDL())
     benchmark.add_ik(TracIK())
     benchmark.add_ik(PickIK())
     benchmark.add_ik(BioIK())
-    benchmark.add_scenario(Random())
+    benchmark.add_scenario(
+        Random(args.target_fraction, args.max_targets, args.subsampling)
+    )
     benchmark.add_robot(UR10())
     benchmark.run()
     benchmark.print()
@@ -1,13 +1,11 @@
 #!/usr/bin/env python3
 import numpy as np
 import optuna
-import reach_ros
 
 from ebike.benchmark import Benchmark
 from ebike.ik import IK_TIMEOUT, AbstractIK
 from ebike.robot import UR10
 from ebike.scenario import SmallTable
-from ebike.utils import result_to_df
 
 
 class PickIKOptuna(AbstractIK):
@@ -20,63 +18,25 @@ class PickIKOptuna(AbstractIK):
     gd_max_time = None
     gd_step_size = None
 
-    def set_config(self, planning_group):
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver",
-            "pick_ik/PickIkPlugin",
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.kinematics_solver_timeout",
-            IK_TIMEOUT,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.mode", "global"
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.stop_optimization_on_valid_solution",
-            True,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.memetic_num_threads", 1
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.memetic_stop_on_first_solution",
-            True,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.memetic_population_size",
-            self.population_size,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.memetic_elite_size",
-            self.elite_size,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.memetic_wipeout_fitness_tol",
-            self.wipeout_fitness_tol,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.memetic_max_generations",
-            self.max_generations,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.memetic_gd_max_iters",
-            self.gd_max_iters,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.memetic_gd_max_time",
-            self.gd_max_time,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.gd_step_size",
-            self.gd_step_size,
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.gd_min_cost_delta", 1.0e-12
-        )
-        reach_ros.set_parameter(
-            f"robot_description_kinematics.{planning_group}.cost_threshold", 10000.0
-        )
+    def get_parameters(self, planning_group):
+        prefix = f"robot_description_kinematics.{planning_group}"
+        return {
+            f"{prefix}.kinematics_solver": "pick_ik/PickIkPlugin",
+            f"{prefix}.kinematics_solver_timeout": IK_TIMEOUT,
+            f"{prefix}.mode": "global",
+            f"{prefix}.stop_optimization_on_valid_solution": True,
+            f"{prefix}.memetic_num_threads": 1,
+            f"{prefix}.memetic_stop_on_first_solution": True,
+            f"{prefix}.memetic_population_size": self.population_size,
+            f"{prefix}.memetic_elite_size": self.elite_size,
+            f"{prefix}.memetic_wipeout_fitness_tol": self.wipeout_fitness_tol,
+            f"{prefix}.memetic_max_generations": self.max_generations,
+            f"{prefix}.memetic_gd_max_iters": self.gd_max_iters,
+            f"{prefix}.memetic_gd_max_time": self.gd_max_time,
+            f"{prefix}.gd_step_size": self.gd_step_size,
+            f"{prefix}.gd_min_cost_delta": 1.0e-12,
+            f"{prefix}.cost_threshold": 10000.0,
+        }
 
     def update_parameters(self, trial):
         self.population_size = trial.suggest_int("memetic_population_size", 1, 100)
@@ -134,12 +94,11 @@ class BenchmarkOptimization:
     def objective(self, trial):
         self.pick_ik.update_parameters(trial)
         result = self.benchmark.run()
-        result = result_to_df(
-            result[self.robot.name][self.scenario.name][self.pick_ik.name][0]
-        )
-        num_reached = np.sum(result.reached == 1)
-        avg_ik_time = np.mean(result.ik_time[result.reached == 1])
-        max_ik_time = np.max(result.ik_time[result.reached == 1])
+        result = result[self.robot.name][self.scenario.name][self.pick_ik.name]
+        num_reached = np.sum(result["reached"])
+        ik_times = result["ik_time"][result["reached"]]
+        avg_ik_time = np.mean(ik_times)
+        max_ik_time = np.max(ik_times)
         # trial.set_user_attr("avg_ik_time", avg_ik_time)
         trial.set_user_attr("max_ik_time", max_ik_time)
         return num_reached / len(result), avg_ik_time
@@ -0,0 +1,33 @@
+# SPDX-License-Identifier: MIT
+import sqlite3
+
+import pytest
+
+from ebike import database
+
+
+@pytest.fixture
+def baseline_db(tmp_path, monkeypatch):
+    # results.db as written before the schema was versioned, with the results
+    # of two experiments interleaved
+    monkeypatch.chdir(tmp_path)
+    with sqlite3.connect(database.DB_FILE) as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "CREATE TABLE experiments (id integer primary key, robot varchar(255), scenario varchar(255), solver varchar(255), time text)"
+        )
+        cur.execute(
+            "CREATE TABLE results (id integer primary key, experiment_id integer references experiments(id), reached integer, ik_time REAL, solution_callback_count integer)"
+        )
+        for experiment_id in (1, 2):
+            cur.execute(
+                "INSERT INTO experiments VALUES (?, 'UR10', 'Table', 'KDL', '2024-01-01 00:00:00.000')",
+                (experiment_id,),
+            )
+        for i in range(5):
+            for experiment_id in (1, 2):
+                cur.execute(
+                    "INSERT INTO results (experiment_id, reached, ik_time, solution_callback_count) VALUES (?, ?, ?, ?)",
+                    (experiment_id, i % 2, 0.001 * i + experiment_id, i),
+                )
+    return tmp_path
@@ -0,0 +1,71 @@
+# SPDX-License-Identifier: MIT
+import numpy as np
+
+from ebike.analysis import PairedResults
+from ebike.utils import RESULT_DTYPE
+
+
+def _results(targets, reached, ik_time):
+    results = np.zeros(len(targets), dtype=RESULT_DTYPE)
+    results["target"] = targets
+    results["reached"] = reached
+    results["ik_time"] = ik_time
+    return results
+
+
+def test_results_are_aligned_by_target():
+    # the same outcomes in a different order
+    paired = PairedResults.from_results(
+        {
+            "KDL": _results([0, 1, 2, 3], [1, 0, 1, 1], [0.1, 0.5, 0.2, 0.4]),
+            "TracIK": _results([3, 2, 1, 0], [1, 1, 0, 1], [0.4, 0.2, 0.5, 0.1]),
+        }
+    )
+    np.testing.assert_array_equal(paired.reached[0], paired.reached[1])
+    np.testing.assert_array_equal(paired.ik_time[0], paired.ik_time[1])
+    np.testing.assert_array_equal(paired.win_matrix(), np.zeros((2, 2)))
+    targets, ratios = paired.speedup("KDL", "TracIK")
+    np.testing.assert_array_equal(targets, [0, 2, 3])
+    np.testing.assert_allclose(ratios, 1)
+
+
+def test_targets_evaluated_by_one_solver_are_not_compared():
+    # TracIK stopped early after targets 0 and 2
+    paired = PairedResults.from_results(
+        {
+            "KDL": _results([0, 1, 2, 3], [1, 1, 0, 1], [0.1, 0.2, 0.5, 0.3]),
+            "TracIK": _results([2, 0], [1, 0], [0.1, 0.5]),
+        },
+        num_targets=5,
+    )
+    assert paired.reached.shape == (2, 5)
+    np.testing.assert_array_equal(paired.common(), [1, 0, 1, 0, 0])
+    np.testing.assert_array_equal(paired.solved_union(), [1, 0, 1, 0, 0])
+    np.testing.assert_array_equal(paired.solved_intersection(), [0, 0, 0, 0, 0])
+    np.testing.assert_array_equal(paired.wins("KDL", "TracIK"), [0])
+    np.testing.assert_array_equal(paired.wins("TracIK", "KDL"), [2])
+    np.testing.assert_array_equal(paired.win_matrix(), [[0, 1], [1, 0]])
+    np.testing.assert_array_equal(
+        paired.solved_exclusively(),
+        [[1, 0, 0, 0, 0], [0, 0, 1, 0, 0]],
+    )
+
+
+def test_speedup_is_the_ratio_of_paired_solve_times():
+    paired = PairedResults.from_results(
+        {
+            "KDL": _results([0, 1, 2, 3], [1, 1, 1, 0], [0.1, 0.2, 0.4, 0.5]),
+            "TracIK": _results([0, 1, 2, 3], [1, 1, 1, 1], [0.2, 0.6, 0.4, 0.1]),
+            "Fast": _results([0, 1, 2], [0, 0, 0], [0.5, 0.5, 0.5]),
+        }
+    )
+    targets, ratios = paired.speedup("KDL", "TracIK")
+    np.testing.assert_array_equal(targets, [0, 1, 2])
+    np.testing.assert_allclose(ratios, [2, 3, 1])
+    speedups = paired.speedup_matrix()
+    np.testing.assert_allclose(speedups[:2, :2], [[1, 2], [0.5, 1]])
+    # no commonly solved targets
+    assert np.isnan(speedups[0, 2]) and np.isnan(speedups[2, 2])
+    np.testing.assert_allclose(
+        paired.speedup_matrix(np.nanmean)[0, 1], np.mean([2, 3, 1])
+    )
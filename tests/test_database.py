@@ -0,0 +1,53 @@
+# SPDX-License-Identifier: MIT
+import sqlite3
+
+import numpy as np
+import pytest
+
+from ebike import database
+
+
+def test_baseline_db_is_migrated(baseline_db):
+    database.ensure_db_exists()
+    with database.connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT MAX(version) FROM schema_version")
+        assert cur.fetchone()[0] == len(database.MIGRATIONS)
+        cur.execute("SELECT complete FROM experiments")
+        assert [complete for (complete,) in cur.fetchall()] == [1, 1]
+    for experiment_id in (1, 2):
+        results = database.load_results(experiment_id)
+        np.testing.assert_array_equal(results["target"], np.arange(5))
+        np.testing.assert_array_equal(results["solution_callback_count"], np.arange(5))
+        np.testing.assert_allclose(
+            results["ik_time"], 0.001 * np.arange(5) + experiment_id
+        )
+
+
+def test_migration_keeps_recorded_targets(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    database.ensure_db_exists()
+    results = np.array(
+        [(3, True, 0.5, 1), (7, False, 1.0, 2)], dtype=database.RESULT_DTYPE
+    )
+    database.save_result("UR10", "Table", "KDL", np.datetime64("now").item(), results)
+    with database.connect() as conn:
+        database._number_targets(conn.cursor())
+    np.testing.assert_array_equal(database.load_results(1)["target"], [3, 7])
+
+
+def test_writer_fails_requests_without_connection(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    database.ensure_db_exists()
+
+    def connect():
+        raise sqlite3.OperationalError("unable to open database file")
+
+    monkeypatch.setattr(database, "connect", connect)
+    writer = database.Writer()
+    with pytest.raises(sqlite3.OperationalError):
+        writer.create_experiment("UR10", "Table", "KDL", None)
+    with pytest.raises(sqlite3.OperationalError):
+        writer.append_results(1, np.zeros(0, dtype=database.RESULT_DTYPE))
+    with pytest.raises(sqlite3.OperationalError):
+        writer.close()
@@ -0,0 +1,44 @@
+# SPDX-License-Identifier: MIT
+import numpy as np
+import pytest
+
+from ebike.ecdf import decimate
+
+
+def _step(x, at):
+    # value of the steps-post curve through (x[i], i) at every point of at
+    return np.searchsorted(x, at, side="right") - 1
+
+
+@pytest.mark.parametrize("upper", [0.5, 1.0, 2.0])
+def test_decimated_curve_stays_within_a_column(upper):
+    rng = np.random.default_rng(0)
+    # steps starts every curve at 0, the repeated time is a jump of 50 targets
+    x = np.sort(np.concatenate([[0.0], rng.exponential(0.2, 5000), [0.3] * 50]))
+    columns = 100
+    keep = decimate(x, upper, columns)
+    assert len(keep) < len(x)
+    at = np.linspace(0, upper, 10001)
+    # the kept corners carry the value of the original curve
+    decimated = keep[_step(x[keep], at)]
+    width = upper / columns
+    assert np.all(decimated <= _step(x, at))
+    assert np.all(decimated >= _step(x, at - width))
+
+
+def test_decimation_keeps_the_ends_of_the_curve():
+    x = np.linspace(0, 2, 1001)
+    keep = decimate(x, 1.0, 10)
+    assert keep[0] == 0
+    # the last corner within the plot and the first one past it
+    end = np.searchsorted(x, 1.0, side="right")
+    assert keep[-2:].tolist() == [end - 1, end]
+    # corners in different columns are all kept
+    x = np.array([0.0, 0.15, 0.35, 0.55, 0.75])
+    np.testing.assert_array_equal(decimate(x, 1.0, 10), np.arange(5))
+
+
+def test_curve_starting_past_the_plot_keeps_its_first_corner():
+    x = np.array([2.0, 3.0, 4.0])
+    np.testing.assert_array_equal(decimate(x, 1.0, 10), [0])
+    np.testing.assert_array_equal(decimate(x, 0.0, 10), [0])
@@ -0,0 +1,95 @@
+# SPDX-License-Identifier: MIT
+import pickle
+
+import numpy as np
+import pytest
+
+from ebike.generator import FAMILIES, build, make_scenario
+from ebike.scenario import read_pcd, resolve_uri
+
+# every family built at the origin of the robot base
+ORIGIN = {"x": 0.0, "y": 0.0, "z": 0.0, "yaw": 0.0}
+
+
+def _build(family, **parameters):
+    return build(family, {**FAMILIES[family], **ORIGIN, **parameters})
+
+
+@pytest.mark.parametrize("family", sorted(FAMILIES))
+def test_point_counts_and_normals(family):
+    vertices, faces, points = _build(family, targets=500)
+    assert points.shape == (500, 7)
+    assert points.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(points[:, 3:6], axis=1), 1, atol=1e-6)
+    assert faces.max() < len(vertices)
+
+
+@pytest.mark.parametrize("family", sorted(FAMILIES))
+def test_seed_determinism(family):
+    _, _, points = _build(family, seed=3)
+    _, _, same = _build(family, seed=3)
+    _, _, other = _build(family, seed=4)
+    np.testing.assert_array_equal(points, same)
+    assert not np.array_equal(points, other)
+
+
+def test_table_targets_on_top():
+    _, _, points = _build("Table", width=1.2, depth=0.8, height=0.7)
+    np.testing.assert_allclose(points[:, 2], 0.7, atol=1e-6)
+    np.testing.assert_allclose(points[:, 5], 1)
+    assert np.all(np.abs(points[:, 0]) <= 0.4 + 1e-6)
+    assert np.all(np.abs(points[:, 1]) <= 0.6 + 1e-6)
+
+
+def test_shelf_targets_on_boards():
+    _, _, points = _build(
+        "Shelf", width=0.9, depth=0.5, height=1.0, shelves=3, thickness=0.02
+    )
+    boards = np.arange(3) * 0.98 / 3 + 0.02
+    assert np.all(np.min(np.abs(points[:, 2, None] - boards), axis=1) < 1e-5)
+    assert np.all(np.abs(points[:, 0]) <= 0.25 + 1e-6)
+    assert np.all(np.abs(points[:, 1]) <= 0.45 - 0.02 + 1e-6)
+
+
+def test_barrel_targets_inside():
+    _, _, points = _build("Barrel", radius=0.2, depth=0.4, segments=32)
+    radius = np.linalg.norm(points[:, :2], axis=1)
+    bottom = points[:, 2] < 1e-6
+    assert np.all(radius <= 0.2 + 1e-6)
+    assert np.all((points[:, 2] >= -1e-6) & (points[:, 2] <= 0.4 + 1e-6))
+    # the wall points face the axis, the bottom points up
+    assert np.all(np.sum(points[~bottom, :2] * points[~bottom, 3:5], axis=1) < 0)
+    np.testing.assert_allclose(points[bottom, 5], 1)
+
+
+def test_pose():
+    _, _, points = _build("Table")
+    _, _, placed = _build("Table", x=1.0, y=-0.5, z=0.1, yaw=np.pi / 2)
+    np.testing.assert_allclose(placed[:, 0], 1.0 - points[:, 1], atol=1e-6)
+    np.testing.assert_allclose(placed[:, 1], -0.5 + points[:, 0], atol=1e-6)
+    np.testing.assert_allclose(placed[:, 2], 0.1 + points[:, 2], atol=1e-6)
+
+
+def test_make_scenario(tmp_path):
+    scenario = make_scenario("Shelf", {"shelves": 3, "targets": 200}, tmp_path)
+    assert make_scenario(
+        "Shelf", {"shelves": "3.0", "targets": 200}, tmp_path
+    ).name == (scenario.name)
+    assert make_scenario("Shelf", {"shelves": 4}, tmp_path).name != scenario.name
+    _, points = read_pcd(scenario.pcd_file)
+    assert len(points) == 200
+    assert type(pickle.loads(pickle.dumps(scenario))).name == scenario.name
+    with pytest.raises(ValueError):
+        make_scenario("Shelf", {"legs": 4}, tmp_path)
+
+
+def test_collision_mesh_uri(tmp_path):
+    scenario = make_scenario("Barrel", {"targets": 100}, tmp_path)
+    config = scenario.get_config("manipulator")
+    uri = config["ik_solver"]["collision_mesh_filename"]
+    assert uri == config["display"]["collision_mesh_filename"]
+    assert uri.startswith("file:///")
+    path = resolve_uri(uri)
+    assert path == str(tmp_path / f"{scenario.name}.ply")
+    vertices, faces = scenario.get_mesh()
+    assert len(faces) and faces.max() < len(vertices)
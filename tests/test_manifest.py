@@ -0,0 +1,70 @@
+# SPDX-License-Identifier: MIT
+import os
+import shutil
+
+import pytest
+
+from ebike import manifest
+
+CONFIG = {"solvers": ["KDL", "TracIK"], "confidence": 0.95, "xlim": [0.001, None]}
+EXPERIMENTS = {"UR10 Table KDL": [1, 2], "UR10 Table TracIK": [3]}
+
+
+@pytest.fixture
+def rendered(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest, "_code_version", "a" * 64)
+    prefix = str(tmp_path / "plot_0")
+    output = tmp_path / "plot_0_bar.png"
+    output.write_bytes(b"")
+    manifest.write_manifest(
+        prefix, manifest.fingerprint(EXPERIMENTS, CONFIG), [str(output)]
+    )
+    return prefix, output
+
+
+def test_unchanged_inputs_are_up_to_date(rendered):
+    prefix, _ = rendered
+    # tuples are stored as lists
+    config = {**CONFIG, "xlim": (0.001, None)}
+    assert manifest.is_up_to_date(prefix, manifest.fingerprint(EXPERIMENTS, config))
+
+
+@pytest.mark.parametrize(
+    "experiments, config",
+    [
+        ({**EXPERIMENTS, "UR10 Table TracIK": [3, 4]}, CONFIG),
+        ({"UR10 Table KDL": [1, 2]}, CONFIG),
+        (EXPERIMENTS, {**CONFIG, "confidence": None}),
+        (EXPERIMENTS, {**CONFIG, "solvers": ["KDL"]}),
+    ],
+)
+def test_changed_inputs_are_stale(rendered, experiments, config):
+    prefix, _ = rendered
+    assert not manifest.is_up_to_date(prefix, manifest.fingerprint(experiments, config))
+
+
+def test_changed_code_is_stale(rendered, monkeypatch):
+    prefix, _ = rendered
+    monkeypatch.setattr(manifest, "_code_version", "b" * 64)
+    assert not manifest.is_up_to_date(prefix, manifest.fingerprint(EXPERIMENTS, CONFIG))
+
+
+def test_missing_output_is_stale(rendered):
+    prefix, output = rendered
+    output.unlink()
+    assert not manifest.is_up_to_date(prefix, manifest.fingerprint(EXPERIMENTS, CONFIG))
+
+
+def test_code_version_follows_the_render_modules(tmp_path, monkeypatch):
+    # a copy of the package whose modules can be edited
+    for module in manifest.RENDER_MODULES:
+        shutil.copy(os.path.join(os.path.dirname(manifest.__file__), module), tmp_path)
+    monkeypatch.setattr(manifest, "__file__", str(tmp_path / "manifest.py"))
+    monkeypatch.setattr(manifest, "_code_version", None)
+    version = manifest.code_version()
+    with open(tmp_path / "stats.py", "a") as f:
+        f.write("\n")
+    # computed once per process
+    assert manifest.code_version() == version
+    monkeypatch.setattr(manifest, "_code_version", None)
+    assert manifest.code_version() != version
@@ -0,0 +1,52 @@
+# SPDX-License-Identifier: MIT
+import os
+
+import numpy as np
+import pytest
+
+from ebike.scenario import _lzf_decompress, read_pcd, write_pcd
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def test_lzf_literals_and_references():
+    # "abc" as literals and a back reference of length 3 to its start
+    assert _lzf_decompress(b"\x02abc\x20\x02", 6) == b"abcabc"
+    # a reference of the extended length 9 that overlaps its own output
+    assert _lzf_decompress(b"\x00a\xe0\x00\x00", 10) == b"a" * 10
+
+
+@pytest.mark.parametrize(
+    "data, size",
+    [
+        (b"\x02ab", 3),  # truncated literal run
+        (b"\x02abc", 2),  # more output than expected
+        (b"\x02abc\x20", 6),  # truncated reference
+        (b"\x02abc\x20\x05", 6),  # reference before the start
+        (b"\x02abc\x20\x02", 5),  # reference past the end
+        (b"\x02abc", 4),  # less output than expected
+    ],
+)
+def test_lzf_corrupt_data(data, size):
+    with pytest.raises(ValueError):
+        _lzf_decompress(data, size)
+
+
+def test_read_binary_compressed_pcd():
+    # LZF compressed field by field, like PCL writes them
+    fields, points = read_pcd(os.path.join(DATA_DIR, "compressed.pcd"))
+    n = np.arange(40)
+    assert fields == ["x", "y", "z"]
+    np.testing.assert_array_equal(
+        points, np.stack([n % 4 * 0.25, np.ones(40), n * 0.1], 1).astype(np.float32)
+    )
+
+
+@pytest.mark.parametrize("data", ["ascii", "binary"])
+def test_pcd_round_trip(tmp_path, data):
+    fields = ["x", "y", "z", "curvature"]
+    points = np.random.default_rng(0).random((100, 4)).astype(np.float32)
+    write_pcd(tmp_path / "cloud.pcd", fields, points, data)
+    read_fields, read_points = read_pcd(tmp_path / "cloud.pcd")
+    assert read_fields == fields
+    np.testing.assert_array_equal(read_points, points)
@@ -0,0 +1,54 @@
+# SPDX-License-Identifier: MIT
+import numpy as np
+
+from ebike.stats import ecdf_intervals, quantile_interval, wilson_interval
+
+
+def _repeat(values, repetitions):
+    return np.tile(values, repetitions), np.tile(np.arange(len(values)), repetitions)
+
+
+def test_repetitions_of_the_same_outcomes_count_once():
+    rng = np.random.default_rng(0)
+    times = np.where(rng.random(200) < 0.6, rng.random(200), np.inf)
+    values, targets = _repeat(times, 3)
+    rate, low, high = ecdf_intervals(values, targets, [0.5, np.inf])
+    single = ecdf_intervals(times, np.arange(200), [0.5, np.inf])
+    np.testing.assert_allclose(rate, single[0])
+    # the variance between the 200 targets has 199 degrees of freedom
+    np.testing.assert_allclose((low, high), wilson_interval(rate * 199, 199))
+
+
+def test_independent_repetitions_are_pooled():
+    rng = np.random.default_rng(1)
+    values = np.where(rng.random(30000) < 0.5, 1.0, np.inf)
+    targets = np.tile(np.arange(10000), 3)
+    rate, low, high = ecdf_intervals(values, targets, np.inf)
+    iid_low, iid_high = wilson_interval(rate * 30000, 30000)
+    np.testing.assert_allclose((low, high), (iid_low, iid_high), rtol=0.05)
+
+
+def test_quantile_interval_matches_target_bootstrap():
+    rng = np.random.default_rng(2)
+    scale = rng.lognormal(0, 1, 300)
+    values, targets = _repeat(scale, 3)
+    values = values * rng.lognormal(0, 0.1, len(values))
+    values[rng.random(len(values)) < 0.2] = np.inf
+    median, low, high = quantile_interval(values, targets, 0.5)
+    assert low < median < high
+    medians = []
+    for _ in range(1000):
+        resampled = rng.integers(300, size=300)
+        v = values.reshape(3, 300)[:, resampled]
+        medians.append(np.quantile(v[np.isfinite(v)], 0.5, method="inverted_cdf"))
+    np.testing.assert_allclose(
+        (low, high), np.quantile(medians, [0.025, 0.975]), rtol=0.1
+    )
+
+
+def test_single_target_and_nothing_reached():
+    values = np.array([1.0, np.inf, 2.0, 3.0])
+    rate, low, high = ecdf_intervals(values, np.zeros(4), [2.0])
+    np.testing.assert_allclose((low, high), wilson_interval(rate, 1))
+    assert quantile_interval(values, np.zeros(4), 0.5) == (2.0, 1.0, 3.0)
+    assert np.isnan(quantile_interval(np.full(3, np.inf), np.arange(3), 0.5)[0])
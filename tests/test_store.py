@@ -0,0 +1,38 @@
+# SPDX-License-Identifier: MIT
+import numpy as np
+
+from ebike import store, summary
+
+
+def test_load_columns_of_baseline_db(baseline_db):
+    target, reached = store.load_columns(1, ("target", "reached"))
+    np.testing.assert_array_equal(target, np.arange(5))
+    np.testing.assert_array_equal(reached, np.arange(5) % 2)
+
+
+def test_export_baseline_db(baseline_db):
+    assert store.export_experiments() == 2
+    assert store.has_results(2)
+    (target,) = store.load_columns(2, ("target",))
+    np.testing.assert_array_equal(target, np.arange(5))
+
+
+def test_summaries_of_baseline_db(baseline_db):
+    summaries = summary.load_summaries([1, 2])
+    assert [s.num_results for s in summaries.values()] == [5, 5]
+    assert [s.reached for s in summaries.values()] == [2, 2]
+
+
+def test_target_results_are_loaded_once(baseline_db, monkeypatch):
+    results = summary.load_target_results([1, 2])
+    target, times, iterations = results[2]
+    np.testing.assert_array_equal(target, np.arange(5))
+    np.testing.assert_array_equal(np.isfinite(times), np.arange(5) % 2 == 1)
+    np.testing.assert_array_equal(iterations[1::2], [1, 3])
+
+    def fail():
+        raise AssertionError("results read again")
+
+    monkeypatch.setattr(summary, "shared_connection", fail)
+    assert summary.load_target_results([2, 1])[2] is results[2]
+    assert len(summary.pool_results([1, 2])[0]) == 10
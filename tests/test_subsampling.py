@@ -0,0 +1,55 @@
+# SPDX-License-Identifier: MIT
+import numpy as np
+import pytest
+
+from ebike.subsampling import METHODS, subsample
+
+
+def _cloud(n=2000):
+    # points on two planes of different density
+    rng = np.random.default_rng(0)
+    xyz = rng.random((n, 3))
+    xyz[: n // 4, 2] = 0
+    xyz[n // 4 :, 2] = 1
+    return xyz
+
+
+@pytest.mark.parametrize("method", sorted(METHODS))
+@pytest.mark.parametrize("count", [1, 10, 100, 1000])
+def test_size_and_subset(method, count):
+    xyz = _cloud()
+    indices = subsample(xyz, count, method)
+    assert len(indices) <= count
+    if method != "voxel":
+        assert len(indices) == count
+    else:
+        assert len(indices) >= count // 2
+    # sorted distinct indices of input points
+    assert np.all(np.diff(indices) > 0)
+    assert indices[0] >= 0 and indices[-1] < len(xyz)
+
+
+@pytest.mark.parametrize("method", sorted(METHODS))
+def test_seed_determinism(method):
+    xyz = _cloud()
+    np.testing.assert_array_equal(
+        subsample(xyz, 100, method, seed=1), subsample(xyz, 100, method, seed=1)
+    )
+    if method != "voxel":
+        assert not np.array_equal(
+            subsample(xyz, 100, method, seed=1), subsample(xyz, 100, method, seed=2)
+        )
+
+
+@pytest.mark.parametrize("method", sorted(METHODS))
+def test_covers_both_planes(method):
+    xyz = _cloud()
+    z = xyz[subsample(xyz, 50, method), 2]
+    assert np.any(z == 0) and np.any(z == 1)
+
+
+def test_all_points_and_unknown_method():
+    xyz = _cloud(100)
+    np.testing.assert_array_equal(subsample(xyz, 100, "farthest"), np.arange(100))
+    with pytest.raises(ValueError):
+        subsample(xyz, 10, "random")
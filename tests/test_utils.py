@@ -0,0 +1,69 @@
+# SPDX-License-Identifier: MIT
+import os
+
+import pytest
+
+from ebike import utils
+
+
+@pytest.fixture
+def xacro(tmp_path, monkeypatch):
+    # the main file names the one file it includes, whose content is the output
+    monkeypatch.setattr(utils, "XACRO_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(utils, "_xacro_cache", {})
+    expansions = []
+
+    def expand(xacro_file, mappings):
+        expansions.append(xacro_file)
+        with open(xacro_file) as f:
+            include = f.read()
+        with open(include) as f:
+            return f.read() + str(mappings), [include]
+
+    monkeypatch.setattr(utils, "_expand_xacro", expand)
+    include = tmp_path / "arm.xacro"
+    include.write_text("<robot/>")
+    main = tmp_path / "robot.urdf.xacro"
+    main.write_text(str(include))
+    return str(main), include, expansions
+
+
+def test_xacro_is_expanded_once(xacro):
+    main, _, expansions = xacro
+    output = utils.get_xacro(main, {"name": "ur"})
+    assert output == "<robot/>{'name': 'ur'}"
+    assert utils.get_xacro(main, {"name": "ur"}) == output
+    # a new process only finds the file cache
+    utils._xacro_cache.clear()
+    assert utils.get_xacro(main, {"name": "ur"}) == output
+    assert len(expansions) == 1
+    assert utils.get_xacro(main, {"name": "ur5"}) != output
+    assert len(expansions) == 2
+
+
+def test_changed_include_invalidates_the_cache(xacro):
+    main, include, expansions = xacro
+    utils.get_xacro(main)
+    # same size, only the hash tells them apart
+    include.write_text("<robot>")
+    stat = include.stat()
+    os.utime(include, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert utils.get_xacro(main) == "<robot>{}"
+    assert len(expansions) == 2
+    # touching a file without changing it keeps the entry
+    os.utime(include, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+    utils._xacro_cache.clear()
+    assert utils.get_xacro(main) == "<robot>{}"
+    assert len(expansions) == 2
+
+
+def test_unwritable_cache_still_returns_output(xacro, tmp_path, monkeypatch, capsys):
+    main, _, expansions = xacro
+    blocked = tmp_path / "blocked"
+    blocked.write_text("")
+    monkeypatch.setattr(utils, "XACRO_CACHE_DIR", str(blocked / "xacro"))
+    assert utils.get_xacro(main) == "<robot/>{}"
+    assert "Could not write xacro cache" in capsys.readouterr().out
+    # the result is still kept for the rest of the process
+    assert utils.get_xacro(main) == "<robot/>{}"
+    assert len(expansions) == 1
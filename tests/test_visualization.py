@@ -0,0 +1,35 @@
+# SPDX-License-Identifier: MIT
+from datetime import datetime
+
+import matplotlib
+import numpy as np
+
+from ebike import database
+from ebike.utils import RESULT_DTYPE
+from ebike.visualization import generate_plot, generate_table
+
+matplotlib.use("Agg")
+
+
+def _save(num_targets, rate):
+    results = np.zeros(num_targets, dtype=RESULT_DTYPE)
+    results["target"] = np.arange(num_targets)
+    results["reached"] = np.arange(num_targets) < rate * num_targets
+    results["ik_time"] = np.linspace(0.001, 0.01, num_targets)
+    results["solution_callback_count"] = 1
+    database.save_result("UR10", "Table", "TracIK", datetime.now(), results)
+
+
+def test_repetitions_of_different_sizes(tmp_path, monkeypatch):
+    # the mean of the rates of the repetitions lies outside of the interval of
+    # their pooled rate
+    monkeypatch.chdir(tmp_path)
+    _save(100, 1.0)
+    _save(1000, 0.5)
+    _save(1000, 0.5)
+    outputs = generate_plot(
+        ["TracIK"], [], [], [], ["Table"], "UR10", str(tmp_path / "plot")
+    )
+    assert all((tmp_path / output).exists() for output in outputs)
+    generate_table(["TracIK"], [], ["Table"], "UR10", str(tmp_path / "table"))
+    assert '"52.4% (' in (tmp_path / "table.txt").read_text()